@@ -1,8 +1,28 @@
-import numpy as np
 import pygame
 import sys
-import math
 import random
+import time
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.util import Finalize
+
+from engine import search as engine_search
+from engine.bitboard import Position
+from engine.board import (
+    create_board,
+    drop_piece,
+    get_next_open_row,
+    is_valid_location,
+    minimax,
+    print_board,
+    winning_move_at,
+)
+from engine.constants import AI_PIECE, COLUMN_COUNT, EMPTY, PLAYER_PIECE, ROW_COUNT
+from engine.incremental import IncrementalEvaluation
+from engine.book import DEFAULT_BOOK_PATH, open_book
+from engine.lazysmp import LazySMPSearcher
+from engine.profiling import PROFILE_THRESHOLD, MoveProfiler
 
 burgundy = (128, 0, 32)
 blue = (173, 216, 230)
@@ -14,18 +34,9 @@ BLACK = (0, 0, 0)
 RED = (255, 0, 0)
 YELLOW = (255, 255, 0)
 
-ROW_COUNT = 6
-COLUMN_COUNT = 7
-
 PLAYER = 0
 AI = 1
 
-EMPTY = 0
-PLAYER_PIECE = 1
-AI_PIECE = 2
-
-WINDOW_LENGTH = 4
-
 depth = 3
 
 # Game states
@@ -50,6 +61,35 @@ ALGORITHM_OPTIONS = {
     2: ALPHA_BETA
 }
 
+# Alpha-beta searches deeper until this many seconds have passed
+MOVE_TIME_BUDGETS = {
+    1: 0.05,
+    2: 0.2,
+    3: 0.5
+}
+
+# Helper processes for the Lazy SMP alpha-beta search (0 searches on one core)
+LAZY_SMP_HELPERS = 0
+
+# Opening book generated with `python -m engine.book`; skipped if missing
+OPENING_BOOK_PATH = DEFAULT_BOOK_PATH
+
+# Directory to keep profiles of AI moves slower than PROFILE_THRESHOLD
+# seconds in, e.g. "profiles" (None turns profiling off). Summarize them
+# with `python -m engine.profiling profiles`.
+PROFILE_DIRECTORY = None
+
+# The game loop runs at this frame rate, also while the AI searches
+FPS = 60
+
+# Frames the exit report covers: the last five minutes of play
+FRAME_COST_WINDOW = 5 * 60 * FPS
+
+# Milliseconds between two moves, and from the last move until the game
+# closes. Both are scheduled; the window keeps handling events meanwhile.
+MOVE_DELAY_MS = 500
+GAME_OVER_DELAY_MS = 3000
+
 # Game settings
 DEFAULT_DIFFICULTY_LEVEL = 2
 DEFAULT_ALGORITHM_OPTION = 1
@@ -59,334 +99,118 @@ current_difficulty_level = DEFAULT_DIFFICULTY_LEVEL
 current_algorithm_option = DEFAULT_ALGORITHM_OPTION
 
 
-def create_board():
-    board = np.zeros((ROW_COUNT, COLUMN_COUNT))
-    return board
-
-
-def drop_piece(board, row, col, piece):
-    board[row][col] = piece
-
-
-def is_valid_location(board, col):
-    return board[ROW_COUNT - 1][col] == 0
+# Screen areas drawn to since the last display update. The draw functions
+# add to it and the game loop passes it to pygame.display.update() once
+# per frame, so only the changed pixels are copied to the window.
+dirty_rects = []
+
+# Pre-rendered surfaces and text, built on first use (pygame must be
+# initialized by then)
+_board_surface = None
+_cell_surfaces = {}
+_fonts = {}
+_texts = {}
+
+
+def _build_surfaces():
+    # One cell sprite per state: the blue square with an empty hole or a
+    # disc, and the empty board made of the empty cell
+    global _board_surface
+    for piece, color in ((EMPTY, BLACK), (PLAYER_PIECE, burgundy), (AI_PIECE, violet)):
+        cell = pygame.Surface((SQUARESIZE, SQUARESIZE)).convert()
+        cell.fill(blue)
+        pygame.draw.circle(cell, color, (SQUARESIZE // 2, SQUARESIZE // 2), RADIUS)
+        _cell_surfaces[piece] = cell
+    _board_surface = pygame.Surface((width, height - SQUARESIZE)).convert()
+    for c in range(COLUMN_COUNT):
+        for r in range(ROW_COUNT):
+            _board_surface.blit(_cell_surfaces[EMPTY], (c * SQUARESIZE, r * SQUARESIZE))
 
 
-def get_next_open_row(board, col):
-    for r in range(ROW_COUNT):
-        if board[r][col] == 0:
-            return r
+def get_font(size, name=None):
+    # name=None is pygame's default font, otherwise a system font
+    key = (size, name)
+    font = _fonts.get(key)
+    if font is None:
+        font = _fonts[key] = pygame.font.SysFont(name, size) if name else pygame.font.Font(None, size)
+    return font
 
 
-def print_board(board):
-    print(np.flip(board, 0))
+def render_text(text, size, color, font_name=None):
+    key = (text, size, color, font_name)
+    surface = _texts.get(key)
+    if surface is None:
+        surface = _texts[key] = get_font(size, font_name).render(text, True, color)
+    return surface
 
 
-def winning_move(board, piece):
-    # Check horizontal locations for win
-    for c in range(COLUMN_COUNT - 3):
-        for r in range(ROW_COUNT):
-            if (
-                    board[r][c] == piece
-                    and board[r][c + 1] == piece
-                    and board[r][c + 2] == piece
-                    and board[r][c + 3] == piece
-            ):
-                return True
-
-    # Check vertical locations for win
-    for c in range(COLUMN_COUNT):
-        for r in range(ROW_COUNT - 3):
-            if (
-                    board[r][c] == piece
-                    and board[r + 1][c] == piece
-                    and board[r + 2][c] == piece
-                    and board[r + 3][c] == piece
-            ):
-                return True
-
-    # Check positively sloped diaganols
-    for c in range(COLUMN_COUNT - 3):
-        for r in range(ROW_COUNT - 3):
-            if (
-                    board[r][c] == piece
-                    and board[r + 1][c + 1] == piece
-                    and board[r + 2][c + 2] == piece
-                    and board[r + 3][c + 3] == piece
-            ):
-                return True
-
-    # Check negatively sloped diaganols
-    for c in range(COLUMN_COUNT - 3):
-        for r in range(3, ROW_COUNT):
-            if (
-                    board[r][c] == piece
-                    and board[r - 1][c + 1] == piece
-                    and board[r - 2][c + 2] == piece
-                    and board[r - 3][c + 3] == piece
-            ):
-                return True
-
-    return False
-
-
-def evaluate_window(window, piece):
-    score = 0
-    opponent_piece = PLAYER_PIECE if piece == AI_PIECE else AI_PIECE
-
-    if window.count(piece) == 4:
-        score += 100
-    elif window.count(piece) == 3 and window.count(EMPTY) == 1:
-        score += 5
-    elif window.count(piece) == 2 and window.count(EMPTY) == 2:
-        score += 2
-
-    if window.count(opponent_piece) == 3 and window.count(EMPTY) == 1:
-        score -= 4
-
-    return score
-
-
-def score_position(board, piece):
-    score = 0
-
-    # Score center column
-    center_array = [int(i) for i in list(board[:, COLUMN_COUNT // 2])]
-    center_count = center_array.count(piece)
-    score += center_count * 3
-
-    # Score horizontal
-    for r in range(ROW_COUNT):
-        row_array = [int(i) for i in list(board[r, :])]
-        for c in range(COLUMN_COUNT - 3):
-            window = row_array[c: c + WINDOW_LENGTH]
-            score += evaluate_window(window, piece)
-
-    # Score vertical
-    for c in range(COLUMN_COUNT):
-        col_array = [int(i) for i in list(board[:, c])]
-        for r in range(ROW_COUNT - 3):
-            window = col_array[r: r + WINDOW_LENGTH]
-            score += evaluate_window(window, piece)
-
-    # Score positive sloped diagonal
-    for r in range(ROW_COUNT - 3):
-        for c in range(COLUMN_COUNT - 3):
-            window = [board[r + i][c + i] for i in range(WINDOW_LENGTH)]
-            score += evaluate_window(window, piece)
-
-    # Score negative sloped diagonal
-    for r in range(ROW_COUNT - 3):
-        for c in range(COLUMN_COUNT - 3):
-            window = [board[r + 3 - i][c + i] for i in range(WINDOW_LENGTH)]
-            score += evaluate_window(window, piece)
-
-    return score
-
-
-def is_terminal_node(board):
-    return winning_move(board, PLAYER_PIECE) or winning_move(board, AI_PIECE) or len(
-        get_valid_locations(board)
-    ) == 0
-
-
-def get_valid_locations(board):
-    valid_locations = []
-    for col in range(COLUMN_COUNT):
-        if is_valid_location(board, col):
-            valid_locations.append(col)
-    return valid_locations
-
-
-def minimax(board, depth, alpha, beta, maximizingPlayer):
-    valid_locations = get_valid_locations(board)
-    is_terminal = is_terminal_node(board)
-
-    if depth == 0 or is_terminal:
-        if is_terminal:
-            if winning_move(board, AI_PIECE):
-                return (None, 100000000000000)
-            elif winning_move(board, PLAYER_PIECE):
-                return (None, -10000000000000)
-            else:  # Game is over, no more valid moves
-                return (None, 0)
-        else:  # Depth is zero
-            return (None, score_position(board, AI_PIECE))
-
-    if maximizingPlayer:
-        value = -math.inf
-        column = random.choice(valid_locations)
-        for col in valid_locations:
-            row = get_next_open_row(board, col)
-            b_copy = board.copy()
-            drop_piece(b_copy, row, col, AI_PIECE)
-            new_score = minimax(b_copy, depth - 1, alpha, beta, False)[1]
-            if new_score > value:
-                value = new_score
-                column = col
-
-            if alpha is not None and beta is not None:
-                alpha = max(alpha, value)
-                if alpha >= beta:
-                    break
-
-        return column, value
-
-    else:  # Minimizing player
-        value = math.inf
-        column = random.choice(valid_locations)
-        for col in valid_locations:
-            row = get_next_open_row(board, col)
-            b_copy = board.copy()
-            drop_piece(b_copy, row, col, PLAYER_PIECE)
-            new_score = minimax(b_copy, depth - 1, alpha, beta, True)[1]
-            if new_score < value:
-                value = new_score
-                column = col
-
-            if beta != None and alpha != None:
-                beta = min(beta, value)
-                if alpha >= beta:
-                    break
-        return column, value
+def cell_rect(row, col):
+    # Row 0 is the bottom row; the top SQUARESIZE strip holds the labels
+    return pygame.Rect(col * SQUARESIZE, height - (row + 1) * SQUARESIZE, SQUARESIZE, SQUARESIZE)
 
 
 def draw_board(board):
+    # Full redraw, for the start of a game; moves use draw_cell
+    if _board_surface is None:
+        _build_surfaces()
+    screen.fill(BLACK)
+    screen.blit(_board_surface, (0, SQUARESIZE))
     for c in range(COLUMN_COUNT):
         for r in range(ROW_COUNT):
-            pygame.draw.rect(
-                screen,
-                blue,
-                (
-                    c * SQUARESIZE,
-                    (r + 1) * SQUARESIZE,
-                    SQUARESIZE,
-                    SQUARESIZE,
-                ),
-            )
-            pygame.draw.circle(
-                screen,
-                BLACK,
-                (
-                    c * SQUARESIZE + SQUARESIZE // 2,
-                    (r + 1) * SQUARESIZE + SQUARESIZE // 2,
-                ),
-                RADIUS,
-            )
+            if board[r][c] != EMPTY:
+                screen.blit(_cell_surfaces[int(board[r][c])], cell_rect(r, c))
+    dirty_rects.append(screen.get_rect())
 
-    for c in range(COLUMN_COUNT):
-        for r in range(ROW_COUNT):
-            if board[r][c] == PLAYER_PIECE:
-                pygame.draw.circle(
-                    screen,
-                    burgundy,
-                    (
-                        c * SQUARESIZE + SQUARESIZE // 2,
-                        height - r * SQUARESIZE - SQUARESIZE // 2,
-                    ),
-                    RADIUS,
-                )
-            elif board[r][c] == AI_PIECE:
-                pygame.draw.circle(
-                    screen,
-                    violet,
-                    (
-                        c * SQUARESIZE + SQUARESIZE // 2,
-                        height - r * SQUARESIZE - SQUARESIZE // 2,
-                    ),
-                    RADIUS,
-                )
-    pygame.display.update()
 
+def draw_cell(row, col, piece):
+    if _board_surface is None:
+        _build_surfaces()
+    dirty_rects.append(screen.blit(_cell_surfaces[piece], cell_rect(row, col)))
 
-def draw_menu():
-    screen.fill(BLACK)
-    title_font = pygame.font.Font(None, 80)
-    title_text = title_font.render("Connect Four", True, BLUE)
-    screen.blit(
-        title_text,
-        (
-            (width - title_text.get_width()) // 2,
-            (height - title_text.get_height()) // 2 - 100,
-        ),
-    )
 
-    levels_font = pygame.font.Font(None, 50)
-    levels_text = levels_font.render("Choose Difficulty Level:", True, silver)
+def draw_label(text, color):
+    dirty_rects.append(screen.blit(render_text(text, 75, color, "arielblack"), (40, 10)))
+
+
+def _blit_centered(text, size, color, y_offset):
+    surface = render_text(text, size, color)
     screen.blit(
-        levels_text,
+        surface,
         (
-            (width - levels_text.get_width()) // 2,
-            (height - levels_text.get_height()) // 2,
+            (width - surface.get_width()) // 2,
+            (height - surface.get_height()) // 2 + y_offset,
         ),
     )
 
-    level_options = [levels_font.render(DIFFICULTY_LEVELS[i], True, BLUE) for i in DIFFICULTY_LEVELS]
-    for i, option_text in enumerate(level_options):
-        screen.blit(
-            option_text,
-            (
-                (width - option_text.get_width()) // 2,
-                (height - option_text.get_height()) // 2 + 50 + i * 50,
-            ),
-        )
 
-    pygame.display.update()
+def draw_menu():
+    screen.fill(BLACK)
+    _blit_centered("Connect Four", 80, BLUE, -100)
+    _blit_centered("Choose Difficulty Level:", 50, silver, 0)
+    for i, level in enumerate(DIFFICULTY_LEVELS):
+        _blit_centered(DIFFICULTY_LEVELS[level], 50, BLUE, 50 + i * 50)
+    dirty_rects.append(screen.get_rect())
 
 
 def draw_difficulty_selection():
     screen.fill(BLACK)
-    title_font = pygame.font.Font(None, 80)
-    title_text = title_font.render("Connect Four", True, BLUE)
-    screen.blit(
-        title_text,
-        (
-            (width - title_text.get_width()) // 2,
-            (height - title_text.get_height()) // 2 - 100,
-        ),
-    )
-
-    algorithm_font = pygame.font.Font(None, 50)
-    algorithm_text = algorithm_font.render("Choose AI Algorithm:", True, silver)
-    screen.blit(
-        algorithm_text,
-        (
-            (width - algorithm_text.get_width()) // 2,
-            (height - algorithm_text.get_height()) // 2,
-        ),
-    )
-
-    algorithm_options = [algorithm_font.render(ALGORITHM_OPTIONS[i], True, BLUE) for i in ALGORITHM_OPTIONS]
-    for i, option_text in enumerate(algorithm_options):
-        screen.blit(
-            option_text,
-            (
-                (width - option_text.get_width()) // 2,
-                (height - option_text.get_height()) // 2 + 50 + i * 50,
-            ),
-        )
-
-    pygame.display.update()
+    _blit_centered("Connect Four", 80, BLUE, -100)
+    _blit_centered("Choose AI Algorithm:", 50, silver, 0)
+    for i, option in enumerate(ALGORITHM_OPTIONS):
+        _blit_centered(ALGORITHM_OPTIONS[option], 50, BLUE, 50 + i * 50)
+    dirty_rects.append(screen.get_rect())
 
 
 def draw_game_over(winning_player):
     screen.fill(BLACK)
-    font = pygame.font.Font(None, 80)
     if winning_player == PLAYER:
-        text = font.render("Computer Wins!", True, BLUE)
+        text = "Computer Wins!"
     elif winning_player == AI:
-        text = font.render("Ai agent Wins!", True, BLUE)
+        text = "Ai agent Wins!"
     else:
-        text = font.render("It's a Tie!", True, BLUE)
-
-    screen.blit(
-        text,
-        (
-            (width - text.get_width()) // 2,
-            (height - text.get_height()) // 2 - 100,
-        ),
-    )
-    pygame.display.update()
+        text = "It's a Tie!"
+    _blit_centered(text, 80, BLUE, -100)
+    dirty_rects.append(screen.get_rect())
 
 
 def initialize_game():
@@ -433,103 +257,209 @@ def handle_difficulty_selection_events():
             elif event.key == pygame.K_2:
                 return 2
 
-pygame.init()
-game_over = False
+
 SQUARESIZE = 100
 
 width = COLUMN_COUNT * SQUARESIZE
 height = (ROW_COUNT + 1) * SQUARESIZE
 size = (width, height)
 
-myfont = pygame.font.SysFont("arielblack", 75)
-
 RADIUS = SQUARESIZE // 2 - 5
 
-screen = pygame.display.set_mode(size)
-draw_menu()
-menu_selected_level = None
-difficulty_selection_selected_algorithm = None
+# Set up by main(), so importing this module opens no window and starts
+# no game. The search state is set up in the AI worker process instead.
+screen = None
+board = None
 game_state = MENU
-turn = random.randint(PLAYER, AI)
-
-while True:
-    if game_state == MENU:
-
-        menu_selected_level = handle_menu_events()
-        # menu_selected_level = 1
-
-        if menu_selected_level is not None:
-            game_state = DIFFICULTY_SELECTION
-
-            current_difficulty_level = menu_selected_level
-
-            draw_difficulty_selection()
+lazy_smp = None
+opening_book = None
+move_profiler = None
+
+
+def choose_ai_move(position):
+    global lazy_smp
+    if current_algorithm_option == 1:
+        return minimax(position, depth, None, None, True)
+
+    book_move = opening_book.lookup(position) if opening_book is not None else None
+    if book_move is not None:
+        return book_move
+    if LAZY_SMP_HELPERS:
+        if lazy_smp is None:
+            lazy_smp = LazySMPSearcher(LAZY_SMP_HELPERS)
+            Finalize(lazy_smp, lazy_smp.close, exitpriority=10)  # Also runs when a worker process exits
+        result = lazy_smp.search(position, MOVE_TIME_BUDGETS[current_difficulty_level])
+        print(lazy_smp.format_report())
+        return result
+    return engine_search.iterative_deepening(position, MOVE_TIME_BUDGETS[current_difficulty_level])
+
+
+def _init_ai_worker(opening_book_path, profile_directory):
+    # Runs once in the AI worker process, which starts from a fresh import
+    # of this module
+    global opening_book, move_profiler
+    opening_book = open_book(opening_book_path)
+    move_profiler = MoveProfiler(profile_directory, PROFILE_THRESHOLD) if profile_directory else None
+
+
+def search_ai_move(board, algorithm_option, difficulty_level):
+    # Runs in the AI worker process
+    global current_algorithm_option, current_difficulty_level
+    current_algorithm_option = algorithm_option
+    current_difficulty_level = difficulty_level
+    position = Position.from_array(board, IncrementalEvaluation())
+    if move_profiler is not None:
+        label = "%s %r" % (ALGORITHM_OPTIONS[current_algorithm_option], position)
+        return move_profiler.profile(label, choose_ai_move, position)
+    return choose_ai_move(position)
+
+
+def format_frame_costs(frame_costs, frame_pixels):
+    # Work per frame (events, game logic, drawing and the display update),
+    # not counting the time the loop sleeps in clock.tick(), and pixels
+    # updated per frame
+    if not frame_costs:
+        return "no frames"
+    costs = sorted(frame_costs)
+    return "%d frames: mean %.3f ms, p99 %.3f ms, max %.3f ms per frame, %.0f pixels updated per frame" % (
+        len(costs),
+        1000 * sum(costs) / len(costs),
+        1000 * costs[int(0.99 * (len(costs) - 1))],
+        1000 * costs[-1],
+        sum(frame_pixels) / len(frame_pixels),
+    )
 
-    elif game_state == DIFFICULTY_SELECTION:
 
-        difficulty_selection_selected_algorithm = handle_difficulty_selection_events()
+def main():
+    global screen, game_state, current_difficulty_level, current_algorithm_option
+    # The search runs in a worker process and the loop polls its future, so
+    # frames and events keep going while the AI thinks, and the search gets
+    # a core of its own. The worker is started now (spawned, not forked from
+    # a process with a window) and imports while the menu is shown.
+    ai_worker = ProcessPoolExecutor(
+        max_workers=1,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_ai_worker,
+        initargs=(OPENING_BOOK_PATH, PROFILE_DIRECTORY),
+    )
+    ai_worker.submit(int)
+    pygame.init()
+    screen = pygame.display.set_mode(size)
+    draw_menu()
+    clock = pygame.time.Clock()
+    frame_costs = deque(maxlen=FRAME_COST_WINDOW)
+    frame_pixels = deque(maxlen=FRAME_COST_WINDOW)
+    ai_search = None
+    ai_search_started = 0
+    game_over = False
+    game_over_at = 0
+    next_move_at = 0
+    menu_selected_level = None
+    difficulty_selection_selected_algorithm = None
+    game_state = MENU
+    turn = random.randint(PLAYER, AI)
 
-        if difficulty_selection_selected_algorithm is not None:
-            game_state = GAME
+    while True:
+        clock.tick(FPS)
+        frame_start = time.perf_counter()
+        now = pygame.time.get_ticks()
 
-            current_algorithm_option = difficulty_selection_selected_algorithm
-            print(current_algorithm_option)
+        if game_state == MENU:
 
-            initialize_game()
+            menu_selected_level = handle_menu_events()
+            # menu_selected_level = 1
 
-    elif game_state == GAME:
-        print("turn=", turn)
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
+            if menu_selected_level is not None:
+                game_state = DIFFICULTY_SELECTION
 
-            elif event.type == pygame.MOUSEBUTTONDOWN:
-                pass
+                current_difficulty_level = menu_selected_level
 
-            # Player's turn
-        if turn == PLAYER and game_over == False:
-            col = random.randint(0, COLUMN_COUNT - 1)
-            if is_valid_location(board, col):
-                pygame.time.wait(500)
-                row = get_next_open_row(board, col)
-                drop_piece(board, row, col, PLAYER_PIECE)
-
-                if winning_move(board, PLAYER_PIECE):
-                    label = myfont.render("Player 1 wins!!", 1, RED)
-                    screen.blit(label, (40, 10))
-                    game_over = True
-                turn += 1
-                turn = turn % 2
-
-                print_board(board)
-                draw_board(board)
+                draw_difficulty_selection()
 
+        elif game_state == DIFFICULTY_SELECTION:
 
-        elif turn == AI and game_over == False:
+            difficulty_selection_selected_algorithm = handle_difficulty_selection_events()
 
-            if current_algorithm_option == 1:
-                col, minimax_score = minimax(board, depth, None, None, True)
+            if difficulty_selection_selected_algorithm is not None:
+                game_state = GAME
 
-            elif current_algorithm_option == 2:
-                col, minimax_score = minimax(board, 5, -math.inf, math.inf, True)
+                current_algorithm_option = difficulty_selection_selected_algorithm
+                print(current_algorithm_option)
 
-            if is_valid_location(board, col):
-                pygame.time.wait(500)
-                row = get_next_open_row(board, col)
-                drop_piece(board, row, col, AI_PIECE)
-
-                if winning_move(board, AI_PIECE):
-                    label = myfont.render("Ai agent wins!!", 1, violet)
-                    screen.blit(label, (40, 10))
-                    game_over = True
-                turn += 1
-                turn = turn % 2
-
-                print_board(board)
+                initialize_game()
                 draw_board(board)
+                next_move_at = now + MOVE_DELAY_MS
+
+        elif game_state == GAME:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    ai_worker.shutdown(wait=False, cancel_futures=True)
+                    print(format_frame_costs(frame_costs, frame_pixels))
+                    pygame.quit()
+                    sys.exit()
+
+                elif event.type == pygame.MOUSEBUTTONDOWN:
+                    pass
+
+            if game_over:
+                if now >= game_over_at:
+                    print("over")
+                    print(format_frame_costs(frame_costs, frame_pixels))
+                    ai_worker.shutdown(wait=False)
+                    sys.exit()
 
-        if game_over:
-            print("over")
-            pygame.time.wait(3000)
-            sys.exit()
\ No newline at end of file
+            # Player's turn
+            elif turn == PLAYER:
+                col = random.randint(0, COLUMN_COUNT - 1)
+                if now >= next_move_at and is_valid_location(board, col):
+                    row = get_next_open_row(board, col)
+                    drop_piece(board, row, col, PLAYER_PIECE)
+
+                    if winning_move_at(board, row, col, PLAYER_PIECE):
+                        draw_label("Player 1 wins!!", RED)
+                        game_over = True
+                        game_over_at = now + GAME_OVER_DELAY_MS
+                    turn += 1
+                    turn = turn % 2
+                    next_move_at = now + MOVE_DELAY_MS
+
+                    print_board(board)
+                    draw_cell(row, col, PLAYER_PIECE)
+
+            elif turn == AI:
+                if ai_search is None:
+                    ai_search = ai_worker.submit(
+                        search_ai_move, board, current_algorithm_option, current_difficulty_level
+                    )
+                    ai_search_started = now
+
+                elif ai_search.done() and now >= next_move_at:
+                    col, minimax_score = ai_search.result()
+                    ai_search = None
+                    print("AI move %d after %d ms, %.1f fps" % (col, now - ai_search_started, clock.get_fps()))
+
+                    if is_valid_location(board, col):
+                        row = get_next_open_row(board, col)
+                        drop_piece(board, row, col, AI_PIECE)
+
+                        if winning_move_at(board, row, col, AI_PIECE):
+                            draw_label("Ai agent wins!!", violet)
+                            game_over = True
+                            game_over_at = now + GAME_OVER_DELAY_MS
+                        turn += 1
+                        turn = turn % 2
+                        next_move_at = now + MOVE_DELAY_MS
+
+                        print_board(board)
+                        draw_cell(row, col, AI_PIECE)
+
+
+        frame_pixels.append(sum(rect.width * rect.height for rect in dirty_rects))
+        if dirty_rects:
+            pygame.display.update(dirty_rects)
+            dirty_rects.clear()
+        frame_costs.append(time.perf_counter() - frame_start)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,3 @@
+from engine.bitboard import Position
+from engine.search import get_valid_locations, is_terminal_node, minimax, pick_best_move, search_with_stats
+from engine.stats import SearchStats
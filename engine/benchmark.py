@@ -0,0 +1,200 @@
+import argparse
+import json
+import math
+import platform
+import statistics
+import time
+
+from engine.bitboard import Position
+from engine.constants import AI_PIECE, COLUMN_COUNT, PLAYER_PIECE, ROW_COUNT, other_piece
+from engine.incremental import IncrementalEvaluation
+from engine.search import Searcher, _minimax, seed
+from engine.solver import Solver, SolverTable, solve_position
+from engine.transposition import TT_MEMORY_BYTES, TranspositionTable
+
+# Fixed positions as the columns played so far, 1-based, first move by
+# the player. Taken from self-play games; nobody has won in any of them.
+BENCHMARK_POSITIONS = [
+    ("empty", "opening", ""),
+    ("center", "opening", "4"),
+    ("center-4435", "opening", "4435"),
+    ("mid-12", "midgame", "473533124224"),
+    ("mid-13", "midgame", "7644747743346"),
+    ("mid-14", "midgame", "55463264442426"),
+    ("end-22", "endgame", "47353312422443533454"),
+    ("end-18", "endgame", "764474774334633347573166"),
+    ("end-16", "endgame", "55463264442426332264266513"),
+]
+
+# Depths searched per engine. The solver ignores depth and only runs on
+# endgame positions.
+BENCHMARK_DEPTHS = {
+    "minimax": (3, 4),
+    "alphabeta": (4, 6, 8),
+    "solver": (None,),
+}
+SOLVER_CATEGORIES = ("endgame",)
+
+BENCHMARK_SEED = 0
+BENCHMARK_FORMAT = 1
+
+
+class _CountingPosition(Position):
+    # Counts the children plain minimax visits, which has no counter of
+    # its own. Only used for an untimed run.
+    __slots__ = ("nodes",)
+
+    def __init__(self, evaluation=None):
+        super().__init__(evaluation)
+        self.nodes = 1
+
+    def make_move(self, col, piece):
+        self.nodes += 1
+        return super().make_move(col, piece)
+
+
+def load_position(moves, position_class=Position):
+    # Returns the position after moves ("4435") and the piece to move
+    position = position_class(IncrementalEvaluation())
+    piece = PLAYER_PIECE
+    for move in moves:
+        position.make_move(int(move) - 1, piece)
+        piece = other_piece(piece)
+    return position, piece
+
+
+# Each engine's setup builds the position and fresh tables outside the
+# timed region and returns (search, nodes): search() runs the timed
+# search, nodes() reads its node count afterwards (None if it keeps none)
+
+
+def _setup_minimax(moves, depth):
+    position, piece = load_position(moves)
+    return lambda: _minimax(position, depth, piece == AI_PIECE), lambda: None
+
+
+def _setup_alphabeta(moves, depth):
+    position, piece = load_position(moves)
+    searcher = Searcher(TranspositionTable(TT_MEMORY_BYTES))
+
+    def search():
+        return searcher.alpha_beta(position, depth, -math.inf, math.inf, piece == AI_PIECE)
+
+    return search, lambda: searcher.nodes
+
+
+def _setup_solver(moves, depth):
+    position, piece = load_position(moves)
+    solver = Solver(SolverTable())
+    return lambda: solve_position(position, piece == AI_PIECE, solver), lambda: solver.nodes
+
+
+ENGINES = {
+    "minimax": _setup_minimax,
+    "alphabeta": _setup_alphabeta,
+    "solver": _setup_solver,
+}
+
+
+def _count_minimax_nodes(moves, depth):
+    position, piece = load_position(moves, _CountingPosition)
+    seed(BENCHMARK_SEED)
+    _minimax(position, depth, piece == AI_PIECE)
+    return position.nodes
+
+
+def percentile(values, fraction):
+    # Nearest-rank percentile
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def benchmark_case(engine, moves, depth, repeats):
+    # Searches one position repeats times from scratch (fresh tables, same
+    # seed) after one untimed warm-up run, and returns the timing
+    # distribution and search statistics
+    setup = ENGINES[engine]
+    search, _ = setup(moves, depth)
+    search()  # Warm-up, not timed
+    times = []
+    for _ in range(repeats):
+        search, node_count = setup(moves, depth)
+        seed(BENCHMARK_SEED)
+        start = time.perf_counter()
+        col, score = search()
+        times.append(time.perf_counter() - start)
+    nodes = node_count()
+    if nodes is None:
+        nodes = _count_minimax_nodes(moves, depth)
+    if depth is None:
+        depth = ROW_COUNT * COLUMN_COUNT - len(moves)  # The solver searches to the end
+    nps = [nodes / t for t in times]
+    return {
+        "depth": depth,
+        "best_move": col,
+        "score": score,
+        "nodes": nodes,
+        "ebf": nodes ** (1 / depth) if depth else 0.0,
+        "times": times,
+        "time_median": statistics.median(times),
+        "time_p95": percentile(times, 0.95),
+        "nps_median": statistics.median(nps),
+        "nps_p95": percentile(nps, 0.05),  # 95% of runs were at least this fast
+    }
+
+
+def run_benchmark(engines=None, repeats=5, positions=BENCHMARK_POSITIONS, progress=None):
+    # Every engine on every position at each of its depths. Returns a
+    # JSON-ready dict.
+    engines = engines or list(ENGINES)
+    results = []
+    for name, category, moves in positions:
+        for engine in engines:
+            if engine == "solver" and category not in SOLVER_CATEGORIES:
+                continue
+            for depth in BENCHMARK_DEPTHS[engine]:
+                result = {"position": name, "category": category, "moves": moves, "engine": engine}
+                result.update(benchmark_case(engine, moves, depth, repeats))
+                results.append(result)
+                if progress is not None:
+                    progress(result)
+    return {
+        "format": BENCHMARK_FORMAT,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "repeats": repeats,
+        "seed": BENCHMARK_SEED,
+        "results": results,
+    }
+
+
+def format_result(result):
+    return "%-12s %-9s d=%-2d move=%s nodes=%-7d ebf=%.2f median=%.4fs p95=%.4fs nps=%.0f" % (
+        result["position"],
+        result["engine"],
+        result["depth"],
+        result["best_move"],
+        result["nodes"],
+        result["ebf"],
+        result["time_median"],
+        result["time_p95"],
+        result["nps_median"],
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search fixed positions and record timings as JSON.")
+    parser.add_argument("--engines", nargs="+", choices=list(ENGINES), default=list(ENGINES))
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--output", default="benchmark.json")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.engines, args.repeats, progress=lambda result: print(format_result(result)))
+    with open(args.output, "w") as output:
+        json.dump(report, output, indent=2)
+    print("wrote %d results to %s" % (len(report["results"]), args.output))
+
+
+if __name__ == "__main__":
+    main()
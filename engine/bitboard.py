@@ -0,0 +1,246 @@
+from engine.constants import (
+    AI_PIECE,
+    COLUMN_COUNT,
+    EMPTY,
+    PLAYER_PIECE,
+    ROW_COUNT,
+    WINDOW_LENGTH,
+    other_piece,
+)
+from engine.transposition import ZOBRIST_KEYS
+
+# Each column takes ROW_COUNT + 1 bits: the extra sentinel bit on top keeps
+# the shift-based four-in-a-row test from wrapping into the next column.
+COLUMN_HEIGHT = ROW_COUNT + 1
+
+
+def cell_bit(row, col):
+    return 1 << (col * COLUMN_HEIGHT + row)
+
+
+BOTTOM_MASK = 0
+for _c in range(COLUMN_COUNT):
+    BOTTOM_MASK |= cell_bit(0, _c)
+BOARD_MASK = BOTTOM_MASK * ((1 << ROW_COUNT) - 1)
+CENTER_MASK = ((1 << ROW_COUNT) - 1) << ((COLUMN_COUNT // 2) * COLUMN_HEIGHT)
+
+
+def _window_mask(cells):
+    mask = 0
+    for r, c in cells:
+        mask |= cell_bit(r, c)
+    return mask
+
+
+# All 69 windows of four, in the same order score_position walks them
+WINDOW_MASKS = []
+
+# Horizontal
+for _r in range(ROW_COUNT):
+    for _c in range(COLUMN_COUNT - 3):
+        WINDOW_MASKS.append(_window_mask([(_r, _c + i) for i in range(WINDOW_LENGTH)]))
+
+# Vertical
+for _c in range(COLUMN_COUNT):
+    for _r in range(ROW_COUNT - 3):
+        WINDOW_MASKS.append(_window_mask([(_r + i, _c) for i in range(WINDOW_LENGTH)]))
+
+# Positive sloped diagonal
+for _r in range(ROW_COUNT - 3):
+    for _c in range(COLUMN_COUNT - 3):
+        WINDOW_MASKS.append(_window_mask([(_r + i, _c + i) for i in range(WINDOW_LENGTH)]))
+
+# Negative sloped diagonal
+for _r in range(ROW_COUNT - 3):
+    for _c in range(COLUMN_COUNT - 3):
+        WINDOW_MASKS.append(_window_mask([(_r + 3 - i, _c + i) for i in range(WINDOW_LENGTH)]))
+
+
+# For every bit index, the windows that contain that cell (at most 16).
+# A win created by a drop has to lie in one of these.
+CELL_WINDOWS = [[] for _ in range(COLUMN_COUNT * COLUMN_HEIGHT)]
+for _window in WINDOW_MASKS:
+    for _i in range(COLUMN_COUNT * COLUMN_HEIGHT):
+        if _window >> _i & 1:
+            CELL_WINDOWS[_i].append(_window)
+
+
+def _window_score(own, opp):
+    # Same weights as evaluate_window, indexed by piece counts
+    empty = WINDOW_LENGTH - own - opp
+    score = 0
+    if own == 4:
+        score += 100
+    elif own == 3 and empty == 1:
+        score += 5
+    elif own == 2 and empty == 2:
+        score += 2
+
+    if opp == 3 and empty == 1:
+        score -= 4
+
+    return score
+
+
+WINDOW_SCORES = [
+    [_window_score(own, opp) for opp in range(WINDOW_LENGTH + 1)]
+    for own in range(WINDOW_LENGTH + 1)
+]
+
+
+def has_four(mask):
+    # vertical, horizontal, positive diagonal, negative diagonal
+    for shift in (1, COLUMN_HEIGHT, COLUMN_HEIGHT + 1, COLUMN_HEIGHT - 1):
+        pairs = mask & (mask >> shift)
+        if pairs & (pairs >> (2 * shift)):
+            return True
+    return False
+
+
+class Position:
+    # Bitboard game state: one integer mask per piece plus column heights.
+    # pieces is indexed by piece value, so pieces[PLAYER_PIECE] and
+    # pieces[AI_PIECE] are the two masks (slot 0 is unused). hash is the
+    # Zobrist key of the pieces, updated incrementally on every move.
+    # evaluation is an optional IncrementalEvaluation kept in step with
+    # make_move/undo_move, turning score() into a field read.
+    __slots__ = ("pieces", "heights", "moves", "hash", "evaluation")
+
+    def __init__(self, evaluation=None):
+        self.pieces = [0, 0, 0]
+        self.heights = [0] * COLUMN_COUNT
+        self.moves = []
+        self.hash = 0
+        self.evaluation = evaluation
+
+    @classmethod
+    def from_array(cls, board, evaluation=None):
+        position = cls(evaluation)
+        for c in range(COLUMN_COUNT):
+            for r in range(ROW_COUNT):
+                piece = int(board[r][c])
+                if piece == EMPTY:
+                    break
+                position.make_move(c, piece)
+        return position
+
+    @classmethod
+    def from_masks(cls, player_mask, ai_mask, evaluation=None):
+        # Rebuilds a position from its two piece masks, e.g. after sending
+        # it to another process
+        position = cls(evaluation)
+        for c in range(COLUMN_COUNT):
+            for r in range(ROW_COUNT):
+                bit = cell_bit(r, c)
+                if player_mask & bit:
+                    position.make_move(c, PLAYER_PIECE)
+                elif ai_mask & bit:
+                    position.make_move(c, AI_PIECE)
+                else:
+                    break
+        return position
+
+    def to_array(self):
+        import numpy as np
+
+        board = np.zeros((ROW_COUNT, COLUMN_COUNT))
+        for piece in (PLAYER_PIECE, AI_PIECE):
+            mask = self.pieces[piece]
+            for c in range(COLUMN_COUNT):
+                for r in range(ROW_COUNT):
+                    if mask & cell_bit(r, c):
+                        board[r][c] = piece
+        return board
+
+    def copy(self):
+        position = Position()
+        position.pieces = self.pieces[:]
+        position.heights = self.heights[:]
+        position.moves = self.moves[:]
+        position.hash = self.hash
+        if self.evaluation is not None:
+            position.evaluation = self.evaluation.copy()
+        return position
+
+    def can_play(self, col):
+        return self.heights[col] < ROW_COUNT
+
+    def valid_moves(self):
+        heights = self.heights
+        return [col for col in range(COLUMN_COUNT) if heights[col] < ROW_COUNT]
+
+    def make_move(self, col, piece):
+        row = self.heights[col]
+        index = col * COLUMN_HEIGHT + row
+        self.pieces[piece] |= 1 << index
+        self.hash ^= ZOBRIST_KEYS[piece][index]
+        self.heights[col] = row + 1
+        self.moves.append(col)
+        if self.evaluation is not None:
+            self.evaluation.add(index, piece)
+            if self.evaluation.consistency_check:
+                self.evaluation.check(self)
+        return row
+
+    def undo_move(self):
+        col = self.moves.pop()
+        row = self.heights[col] - 1
+        index = col * COLUMN_HEIGHT + row
+        bit = 1 << index
+        pieces = self.pieces
+        piece = PLAYER_PIECE if pieces[PLAYER_PIECE] & bit else AI_PIECE
+        pieces[piece] ^= bit
+        self.hash ^= ZOBRIST_KEYS[piece][index]
+        self.heights[col] = row
+        if self.evaluation is not None:
+            self.evaluation.remove(index, piece)
+            if self.evaluation.consistency_check:
+                self.evaluation.check(self)
+        return col
+
+    def piece_at(self, row, col):
+        bit = cell_bit(row, col)
+        if self.pieces[PLAYER_PIECE] & bit:
+            return PLAYER_PIECE
+        if self.pieces[AI_PIECE] & bit:
+            return AI_PIECE
+        return EMPTY
+
+    def is_win(self, piece):
+        # Full-board check, used for positions with no known last move
+        return has_four(self.pieces[piece])
+
+    def winner_at(self, col):
+        # Only looks at the lines through the top piece of col, i.e. the
+        # piece just dropped there. Returns its piece if it made four in a
+        # row, otherwise EMPTY.
+        row = self.heights[col] - 1
+        if row < 0:
+            return EMPTY
+        index = col * COLUMN_HEIGHT + row
+        piece = PLAYER_PIECE if self.pieces[PLAYER_PIECE] >> index & 1 else AI_PIECE
+        mask = self.pieces[piece]
+        for window in CELL_WINDOWS[index]:
+            if mask & window == window:
+                return piece
+        return EMPTY
+
+    def is_full(self):
+        return (self.pieces[PLAYER_PIECE] | self.pieces[AI_PIECE]) == BOARD_MASK
+
+    def move_count(self):
+        return len(self.moves)
+
+    def score(self, piece):
+        # Bitboard equivalent of score_position(board, piece)
+        if self.evaluation is not None:
+            return self.evaluation.scores[piece]
+        own = self.pieces[piece]
+        opp = self.pieces[other_piece(piece)]
+        score = (own & CENTER_MASK).bit_count() * 3
+        for window in WINDOW_MASKS:
+            score += WINDOW_SCORES[(own & window).bit_count()][(opp & window).bit_count()]
+        return score
+
+    def __repr__(self):
+        return "Position(%r)" % "".join(str(c + 1) for c in self.moves)
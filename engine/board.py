@@ -0,0 +1,261 @@
+import math
+
+import numpy as np
+
+from engine import search as engine_search
+from engine.bitboard import Position
+from engine.constants import (
+    AI_PIECE,
+    AI_WIN_SCORE,
+    COLUMN_COUNT,
+    EMPTY,
+    PLAYER_PIECE,
+    PLAYER_WIN_SCORE,
+    ROW_COUNT,
+    WINDOW_LENGTH,
+)
+from engine.evaluation import score_position
+
+# The GUI's board: a ROW_COUNT x COLUMN_COUNT numpy array, row 0 at the
+# bottom, holding EMPTY, PLAYER_PIECE or AI_PIECE. The functions taking a
+# board also accept an engine Position and hand it to the bitboard engine.
+
+
+def create_board():
+    board = np.zeros((ROW_COUNT, COLUMN_COUNT))
+    return board
+
+
+def drop_piece(board, row, col, piece):
+    board[row][col] = piece
+
+
+def is_valid_location(board, col):
+    return board[ROW_COUNT - 1][col] == 0
+
+
+def get_next_open_row(board, col):
+    for r in range(ROW_COUNT):
+        if board[r][col] == 0:
+            return r
+
+
+def get_column_heights(board):
+    return [get_next_open_row(board, col) if is_valid_location(board, col) else ROW_COUNT
+            for col in range(COLUMN_COUNT)]
+
+
+def make_move(board, heights, col, piece):
+    # Drops in place using the tracked column heights instead of scanning
+    row = heights[col]
+    board[row][col] = piece
+    heights[col] = row + 1
+    return row
+
+
+def undo_move(board, heights, col):
+    row = heights[col] - 1
+    board[row][col] = EMPTY
+    heights[col] = row
+
+
+def print_board(board):
+    print(np.flip(board, 0))
+
+
+def winning_move(board, piece):
+    # Full-board scan, kept as the reference check. The search and the
+    # game loop use winning_move_at on the cell just filled instead.
+    # Check horizontal locations for win
+    for c in range(COLUMN_COUNT - 3):
+        for r in range(ROW_COUNT):
+            if (
+                    board[r][c] == piece
+                    and board[r][c + 1] == piece
+                    and board[r][c + 2] == piece
+                    and board[r][c + 3] == piece
+            ):
+                return True
+
+    # Check vertical locations for win
+    for c in range(COLUMN_COUNT):
+        for r in range(ROW_COUNT - 3):
+            if (
+                    board[r][c] == piece
+                    and board[r + 1][c] == piece
+                    and board[r + 2][c] == piece
+                    and board[r + 3][c] == piece
+            ):
+                return True
+
+    # Check positively sloped diaganols
+    for c in range(COLUMN_COUNT - 3):
+        for r in range(ROW_COUNT - 3):
+            if (
+                    board[r][c] == piece
+                    and board[r + 1][c + 1] == piece
+                    and board[r + 2][c + 2] == piece
+                    and board[r + 3][c + 3] == piece
+            ):
+                return True
+
+    # Check negatively sloped diaganols
+    for c in range(COLUMN_COUNT - 3):
+        for r in range(3, ROW_COUNT):
+            if (
+                    board[r][c] == piece
+                    and board[r - 1][c + 1] == piece
+                    and board[r - 2][c + 2] == piece
+                    and board[r - 3][c + 3] == piece
+            ):
+                return True
+
+    return False
+
+
+def winning_move_at(board, row, col, piece):
+    # Only checks the four lines through (row, col), the cell just filled
+    for dr, dc in ((0, 1), (1, 0), (1, 1), (-1, 1)):
+        count = 1
+        for sign in (1, -1):
+            r = row + sign * dr
+            c = col + sign * dc
+            while 0 <= r < ROW_COUNT and 0 <= c < COLUMN_COUNT and board[r][c] == piece:
+                count += 1
+                r += sign * dr
+                c += sign * dc
+        if count >= WINDOW_LENGTH:
+            return True
+    return False
+
+
+def get_top_row(board, col):
+    # Row of the highest piece in col, i.e. where the last drop landed
+    for r in range(ROW_COUNT - 1, -1, -1):
+        if board[r][col] != EMPTY:
+            return r
+
+
+def last_move_winner(board, last_move, heights=None):
+    if heights is None:
+        row = get_top_row(board, last_move)
+    else:
+        row = heights[last_move] - 1 if heights[last_move] else None
+    if row is None:
+        return EMPTY
+    piece = int(board[row][last_move])
+    if winning_move_at(board, row, last_move, piece):
+        return piece
+    return EMPTY
+
+
+def is_terminal_node(board, last_move=None, heights=None):
+    if isinstance(board, Position):
+        return engine_search.is_terminal_node(board, last_move)
+    if last_move is not None:
+        if last_move_winner(board, last_move, heights) != EMPTY:
+            return True
+        if heights is not None:
+            return min(heights) == ROW_COUNT
+        return len(get_valid_locations(board)) == 0
+    return winning_move(board, PLAYER_PIECE) or winning_move(board, AI_PIECE) or len(
+        get_valid_locations(board)
+    ) == 0
+
+
+def get_valid_locations(board):
+    if isinstance(board, Position):
+        return board.valid_moves()
+    valid_locations = []
+    for col in range(COLUMN_COUNT):
+        if is_valid_location(board, col):
+            valid_locations.append(col)
+    return valid_locations
+
+
+def minimax(board, depth, alpha, beta, maximizingPlayer, last_move=None, heights=None):
+    # last_move is the column just played, so the terminal check only has
+    # to look at the lines through that piece. The children are searched by
+    # making and undoing moves on board itself; heights tracks the next open
+    # row of every column and is computed once at the root.
+    if isinstance(board, Position):
+        return engine_search.minimax(board, depth, alpha, beta, maximizingPlayer, last_move=last_move)
+
+    if heights is None:
+        heights = get_column_heights(board)
+    valid_locations = [col for col in range(COLUMN_COUNT) if heights[col] < ROW_COUNT]
+    is_terminal = is_terminal_node(board, last_move, heights)
+
+    if depth == 0 or is_terminal:
+        if is_terminal:
+            if last_move is not None:
+                winner = last_move_winner(board, last_move, heights)
+            elif winning_move(board, AI_PIECE):
+                winner = AI_PIECE
+            elif winning_move(board, PLAYER_PIECE):
+                winner = PLAYER_PIECE
+            else:
+                winner = EMPTY
+
+            if winner == AI_PIECE:
+                return (None, AI_WIN_SCORE)
+            elif winner == PLAYER_PIECE:
+                return (None, PLAYER_WIN_SCORE)
+            else:  # Game is over, no more valid moves
+                return (None, 0)
+        else:  # Depth is zero
+            return (None, score_position(board, AI_PIECE))
+
+    if maximizingPlayer:
+        value = -math.inf
+        column = engine_search._rng.choice(valid_locations)
+        for col in valid_locations:
+            make_move(board, heights, col, AI_PIECE)
+            new_score = minimax(board, depth - 1, alpha, beta, False, col, heights)[1]
+            undo_move(board, heights, col)
+            if new_score > value:
+                value = new_score
+                column = col
+
+            if alpha is not None and beta is not None:
+                alpha = max(alpha, value)
+                if alpha >= beta:
+                    break
+
+        return column, value
+
+    else:  # Minimizing player
+        value = math.inf
+        column = engine_search._rng.choice(valid_locations)
+        for col in valid_locations:
+            make_move(board, heights, col, PLAYER_PIECE)
+            new_score = minimax(board, depth - 1, alpha, beta, True, col, heights)[1]
+            undo_move(board, heights, col)
+            if new_score < value:
+                value = new_score
+                column = col
+
+            if beta != None and alpha != None:
+                beta = min(beta, value)
+                if alpha >= beta:
+                    break
+        return column, value
+
+
+def pick_best_move(board, piece):
+    if isinstance(board, Position):
+        return engine_search.pick_best_move(board, piece)
+
+    heights = get_column_heights(board)
+    valid_locations = get_valid_locations(board)
+    best_score = -10000
+    best_col = engine_search._rng.choice(valid_locations)
+    for col in valid_locations:
+        make_move(board, heights, col, piece)
+        score = score_position(board, piece)
+        undo_move(board, heights, col)
+        if score > best_score:
+            best_score = score
+            best_col = col
+
+    return best_col
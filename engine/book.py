@@ -0,0 +1,182 @@
+import argparse
+import mmap
+import struct
+import time
+
+from engine.bitboard import COLUMN_HEIGHT, Position
+from engine.constants import AI_PIECE, COLUMN_COUNT, PLAYER_PIECE, other_piece
+from engine.incremental import IncrementalEvaluation
+from engine.search import Searcher
+from engine.transposition import MAXIMIZING_KEY, ZOBRIST_KEYS, TranspositionTable
+
+# File layout: a header, then fixed-size records sorted by key.
+# Record: 64-bit canonical position key, 64-bit score for the side to
+# move, 8-bit best column.
+BOOK_MAGIC = b"C4BK"
+BOOK_VERSION = 1
+HEADER = struct.Struct("<4sHHHI")  # magic, version, max ply, search depth, record count
+RECORD = struct.Struct("<Qqb")
+KEY = struct.Struct("<Q")
+
+DEFAULT_BOOK_PATH = "opening_book.bin"
+
+# Transposition table size per booked position while generating
+BOOK_TABLE_BYTES = 4 * 1024 * 1024
+
+_COLUMN_MASK = (1 << COLUMN_HEIGHT) - 1
+
+
+def mirror_mask(mask):
+    mirrored = 0
+    for c in range(COLUMN_COUNT):
+        column = (mask >> (c * COLUMN_HEIGHT)) & _COLUMN_MASK
+        mirrored |= column << ((COLUMN_COUNT - 1 - c) * COLUMN_HEIGHT)
+    return mirrored
+
+
+def hash_masks(player_mask, ai_mask):
+    # Zobrist hash of a position given as masks; equal to Position.hash
+    key = 0
+    for piece, mask in ((PLAYER_PIECE, player_mask), (AI_PIECE, ai_mask)):
+        while mask:
+            low = mask & -mask
+            key ^= ZOBRIST_KEYS[piece][low.bit_length() - 1]
+            mask ^= low
+    return key
+
+
+def book_key(position, piece):
+    # Key of the position with piece to move, folded with its mirror image.
+    # Returns the key and whether it is the mirror's, in which case the
+    # stored column is mirrored too.
+    side = MAXIMIZING_KEY if piece == AI_PIECE else 0
+    key = position.hash ^ side
+    mirrored_key = hash_masks(
+        mirror_mask(position.pieces[PLAYER_PIECE]), mirror_mask(position.pieces[AI_PIECE])
+    ) ^ side
+    if mirrored_key < key:
+        return mirrored_key, True
+    return key, False
+
+
+def _mirror_column(col):
+    return COLUMN_COUNT - 1 - col
+
+
+def generate_book(path, max_ply, depth, progress=None):
+    # Searches every position reachable in up to max_ply moves, with
+    # either side starting, and writes the best move of each one. Mirror
+    # images are searched once. Every position gets a fresh table so its
+    # entry does not depend on the order positions are visited in.
+    entries = {}
+    start = time.perf_counter()
+
+    def visit(position, piece, ply):
+        key, mirrored = book_key(position, piece)
+        if key in entries:
+            return
+        searcher = Searcher(TranspositionTable(BOOK_TABLE_BYTES))
+        col, score = searcher.iterative_deepening(position, None, piece == AI_PIECE, depth)
+        if piece == PLAYER_PIECE:
+            score = -score  # iterative_deepening scores are from the AI's side
+        entries[key] = (score, _mirror_column(col) if mirrored else col)
+        if progress is not None and len(entries) % 100 == 0:
+            progress(len(entries), time.perf_counter() - start)
+        if ply == max_ply:
+            return
+        for col in position.valid_moves():
+            position.make_move(col, piece)
+            if position.winner_at(col) == 0:
+                visit(position, other_piece(piece), ply + 1)
+            position.undo_move()
+
+    for first in (PLAYER_PIECE, AI_PIECE):
+        visit(Position(IncrementalEvaluation()), first, 0)
+
+    with open(path, "wb") as book_file:
+        book_file.write(HEADER.pack(BOOK_MAGIC, BOOK_VERSION, max_ply, depth, len(entries)))
+        for key in sorted(entries):
+            score, col = entries[key]
+            book_file.write(RECORD.pack(key, score, col))
+    return len(entries)
+
+
+class OpeningBook:
+    # Read-only view of a book file through mmap: lookups binary-search the
+    # sorted records in place, nothing is loaded onto the heap.
+
+    def __init__(self, path=DEFAULT_BOOK_PATH):
+        self.file = open(path, "rb")
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.max_ply, self.depth, self.count = HEADER.unpack_from(self.data, 0)
+        if magic != BOOK_MAGIC or version != BOOK_VERSION:
+            self.close()
+            raise ValueError("%s is not a version %d opening book" % (path, BOOK_VERSION))
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _find(self, key):
+        lo = 0
+        hi = self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            offset = HEADER.size + mid * RECORD.size
+            mid_key = KEY.unpack_from(self.data, offset)[0]
+            if mid_key < key:
+                lo = mid + 1
+            elif mid_key > key:
+                hi = mid
+            else:
+                return RECORD.unpack_from(self.data, offset)
+        return None
+
+    def lookup(self, position, maximizingPlayer=True):
+        # (column, score) like minimax, or None if the position is not in
+        # the book. The score is from the AI's point of view.
+        if position.move_count() > self.max_ply:
+            return None
+        piece = AI_PIECE if maximizingPlayer else PLAYER_PIECE
+        key, mirrored = book_key(position, piece)
+        record = self._find(key)
+        if record is None:
+            return None
+        _, score, col = record
+        if mirrored:
+            col = _mirror_column(col)
+        if not maximizingPlayer:
+            score = -score
+        return col, score
+
+
+def open_book(path=DEFAULT_BOOK_PATH):
+    # The book is optional: None if it has not been generated
+    try:
+        return OpeningBook(path)
+    except FileNotFoundError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate an opening book.")
+    parser.add_argument("--ply", type=int, default=4, help="book every position up to this many moves")
+    parser.add_argument("--depth", type=int, default=8, help="search depth per position")
+    parser.add_argument("--output", default=DEFAULT_BOOK_PATH)
+    args = parser.parse_args()
+
+    def progress(count, elapsed):
+        print("%d positions, %.1fs" % (count, elapsed))
+
+    count = generate_book(args.output, args.ply, args.depth, progress)
+    print("wrote %d positions to %s" % (count, args.output))
+
+
+if __name__ == "__main__":
+    main()
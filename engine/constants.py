@@ -0,0 +1,16 @@
+ROW_COUNT = 6
+COLUMN_COUNT = 7
+
+EMPTY = 0
+PLAYER_PIECE = 1
+AI_PIECE = 2
+
+WINDOW_LENGTH = 4
+
+# Terminal scores returned by minimax (kept identical to the GUI scripts)
+AI_WIN_SCORE = 100000000000000
+PLAYER_WIN_SCORE = -10000000000000
+
+
+def other_piece(piece):
+    return PLAYER_PIECE if piece == AI_PIECE else AI_PIECE
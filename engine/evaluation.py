@@ -0,0 +1,188 @@
+import numpy as np
+
+from engine.bitboard import WINDOW_SCORES
+from engine.constants import (
+    AI_PIECE,
+    COLUMN_COUNT,
+    EMPTY,
+    PLAYER_PIECE,
+    ROW_COUNT,
+    WINDOW_LENGTH,
+    other_piece,
+)
+
+
+def _window_cells():
+    windows = []
+
+    # Horizontal
+    for r in range(ROW_COUNT):
+        for c in range(COLUMN_COUNT - 3):
+            windows.append([(r, c + i) for i in range(WINDOW_LENGTH)])
+
+    # Vertical
+    for c in range(COLUMN_COUNT):
+        for r in range(ROW_COUNT - 3):
+            windows.append([(r + i, c) for i in range(WINDOW_LENGTH)])
+
+    # Positive sloped diagonal
+    for r in range(ROW_COUNT - 3):
+        for c in range(COLUMN_COUNT - 3):
+            windows.append([(r + i, c + i) for i in range(WINDOW_LENGTH)])
+
+    # Negative sloped diagonal
+    for r in range(ROW_COUNT - 3):
+        for c in range(COLUMN_COUNT - 3):
+            windows.append([(r + 3 - i, c + i) for i in range(WINDOW_LENGTH)])
+
+    return windows
+
+
+# (69, 4) flat indices into board.ravel(), one row per window of four
+WINDOW_INDEX = np.array(
+    [[r * COLUMN_COUNT + c for r, c in window] for window in _window_cells()],
+    dtype=np.intp,
+)
+CENTER_INDEX = np.array(
+    [r * COLUMN_COUNT + COLUMN_COUNT // 2 for r in range(ROW_COUNT)], dtype=np.intp
+)
+
+
+def score_position(board, piece):
+    # Vectorized score_position: gathers every window at once and applies
+    # the evaluate_window weights to the per-window counts
+    cells = np.asarray(board).ravel()
+    windows = cells[WINDOW_INDEX]
+    own = np.count_nonzero(windows == piece, axis=1)
+    opp = np.count_nonzero(windows == other_piece(piece), axis=1)
+    empty = np.count_nonzero(windows == EMPTY, axis=1)
+
+    scores = np.where(
+        own == 4,
+        100,
+        np.where((own == 3) & (empty == 1), 5, np.where((own == 2) & (empty == 2), 2, 0)),
+    )
+    scores -= 4 * ((opp == 3) & (empty == 1))
+
+    center_count = np.count_nonzero(cells[CENTER_INDEX] == piece)
+    return int(scores.sum()) + int(center_count) * 3
+
+
+# Boards per chunk in the batch functions: the temporaries stay a few
+# hundred bytes per board whatever N is
+BATCH_CHUNK = 1 << 16
+
+# The batch functions read each window's cells as a base-3 number (cell i
+# weighs 3**i), which fits in an int8. WINDOW_CODE_SCORES[piece][code] is
+# the evaluate_window score of that window.
+WINDOW_CODE_COUNT = 3 ** WINDOW_LENGTH
+
+
+def _window_code_scores():
+    table = np.zeros((3, WINDOW_CODE_COUNT), dtype=np.int16)
+    for code in range(WINDOW_CODE_COUNT):
+        digits = [(code // 3 ** i) % 3 for i in range(WINDOW_LENGTH)]
+        for piece in (PLAYER_PIECE, AI_PIECE):
+            table[piece, code] = WINDOW_SCORES[digits.count(piece)][digits.count(other_piece(piece))]
+    return table
+
+
+WINDOW_CODE_SCORES = _window_code_scores()
+
+
+def _window_codes(boards, chunk_size):
+    # Yields (start, cells, codes) for boards[start:start + n]. Boards run
+    # along the last axis so every gather copies contiguous rows: cells is
+    # (42, n) int8 and codes the (69, n) int8 window codes.
+    boards = np.asarray(boards)
+    if boards.ndim != 3 or boards.shape[1:] != (ROW_COUNT, COLUMN_COUNT):
+        raise ValueError("expected boards of shape (N, %d, %d), got %s" % (ROW_COUNT, COLUMN_COUNT, boards.shape))
+    flat = boards.reshape(len(boards), ROW_COUNT * COLUMN_COUNT)
+    for start in range(0, len(flat), chunk_size):
+        cells = np.ascontiguousarray(flat[start:start + chunk_size].T, dtype=np.int8)
+        codes = cells[WINDOW_INDEX[:, WINDOW_LENGTH - 1]]
+        for i in range(WINDOW_LENGTH - 2, -1, -1):
+            codes *= 3
+            codes += cells[WINDOW_INDEX[:, i]]
+        yield start, cells, codes
+
+
+def evaluate_positions(boards, piece, chunk_size=BATCH_CHUNK):
+    # score_position and winning_move for a stack of boards in one pass:
+    # (N, ROW_COUNT, COLUMN_COUNT) in, N int64 scores and N booleans out
+    scores = np.empty(len(boards), dtype=np.int64)
+    wins = np.empty(len(boards), dtype=bool)
+    weights = WINDOW_CODE_SCORES[piece]
+    four = piece * (WINDOW_CODE_COUNT - 1) // 2  # every digit equal to piece
+    for start, cells, codes in _window_codes(boards, chunk_size):
+        end = start + cells.shape[1]
+        scores[start:end] = weights[codes].sum(axis=0, dtype=np.int64)
+        scores[start:end] += 3 * np.count_nonzero(cells[CENTER_INDEX] == piece, axis=0)
+        wins[start:end] = (codes == four).any(axis=0)
+    return scores, wins
+
+
+def score_positions(boards, piece, chunk_size=BATCH_CHUNK):
+    return evaluate_positions(boards, piece, chunk_size)[0]
+
+
+def winning_moves(boards, piece, chunk_size=BATCH_CHUNK):
+    return evaluate_positions(boards, piece, chunk_size)[1]
+
+
+# Original window-by-window implementation, kept as the reference the
+# vectorized and bitboard evaluators are checked against
+
+
+def evaluate_window(window, piece):
+    score = 0
+    opponent_piece = PLAYER_PIECE if piece == AI_PIECE else AI_PIECE
+
+    if window.count(piece) == 4:
+        score += 100
+    elif window.count(piece) == 3 and window.count(EMPTY) == 1:
+        score += 5
+    elif window.count(piece) == 2 and window.count(EMPTY) == 2:
+        score += 2
+
+    if window.count(opponent_piece) == 3 and window.count(EMPTY) == 1:
+        score -= 4
+
+    return score
+
+
+def score_position_reference(board, piece):
+    score = 0
+
+    # Score center column
+    center_array = [int(i) for i in list(board[:, COLUMN_COUNT // 2])]
+    center_count = center_array.count(piece)
+    score += center_count * 3
+
+    # Score horizontal
+    for r in range(ROW_COUNT):
+        row_array = [int(i) for i in list(board[r, :])]
+        for c in range(COLUMN_COUNT - 3):
+            window = row_array[c: c + WINDOW_LENGTH]
+            score += evaluate_window(window, piece)
+
+    # Score vertical
+    for c in range(COLUMN_COUNT):
+        col_array = [int(i) for i in list(board[:, c])]
+        for r in range(ROW_COUNT - 3):
+            window = col_array[r: r + WINDOW_LENGTH]
+            score += evaluate_window(window, piece)
+
+    # Score positive sloped diagonal
+    for r in range(ROW_COUNT - 3):
+        for c in range(COLUMN_COUNT - 3):
+            window = [board[r + i][c + i] for i in range(WINDOW_LENGTH)]
+            score += evaluate_window(window, piece)
+
+    # Score negative sloped diagonal
+    for r in range(ROW_COUNT - 3):
+        for c in range(COLUMN_COUNT - 3):
+            window = [board[r + 3 - i][c + i] for i in range(WINDOW_LENGTH)]
+            score += evaluate_window(window, piece)
+
+    return score
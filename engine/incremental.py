@@ -0,0 +1,70 @@
+from engine.bitboard import CELL_WINDOWS, CENTER_MASK, WINDOW_MASKS, WINDOW_SCORES
+from engine.constants import AI_PIECE, PLAYER_PIECE
+
+# Window ids through each bit index, and whether the bit is in the center column
+_WINDOW_ID = {window: i for i, window in enumerate(WINDOW_MASKS)}
+CELL_WINDOW_IDS = [[_WINDOW_ID[window] for window in windows] for windows in CELL_WINDOWS]
+CELL_CENTER_BONUS = [3 if CENTER_MASK >> i & 1 else 0 for i in range(len(CELL_WINDOWS))]
+
+
+class IncrementalEvaluation:
+    # Per-window piece counts plus the running score_position value for
+    # both pieces. A drop only changes the windows through one cell, so
+    # add/remove cost O(windows through the cell) instead of all 69.
+    # With consistency_check set, every update is cross-checked against a
+    # full score_position of the position (slow, meant for tests).
+    __slots__ = ("counts", "scores", "consistency_check")
+
+    def __init__(self, consistency_check=False):
+        self.counts = [None, [0] * len(WINDOW_MASKS), [0] * len(WINDOW_MASKS)]
+        self.scores = [0, 0, 0]
+        self.consistency_check = consistency_check
+
+    def copy(self):
+        evaluation = IncrementalEvaluation(self.consistency_check)
+        evaluation.counts = [None, self.counts[PLAYER_PIECE][:], self.counts[AI_PIECE][:]]
+        evaluation.scores = self.scores[:]
+        return evaluation
+
+    def add(self, index, piece):
+        opp = PLAYER_PIECE if piece == AI_PIECE else AI_PIECE
+        own_counts = self.counts[piece]
+        opp_counts = self.counts[opp]
+        own_score = self.scores[piece] + CELL_CENTER_BONUS[index]
+        opp_score = self.scores[opp]
+        for w in CELL_WINDOW_IDS[index]:
+            a = own_counts[w]
+            o = opp_counts[w]
+            own_score += WINDOW_SCORES[a + 1][o] - WINDOW_SCORES[a][o]
+            opp_score += WINDOW_SCORES[o][a + 1] - WINDOW_SCORES[o][a]
+            own_counts[w] = a + 1
+        self.scores[piece] = own_score
+        self.scores[opp] = opp_score
+
+    def remove(self, index, piece):
+        opp = PLAYER_PIECE if piece == AI_PIECE else AI_PIECE
+        own_counts = self.counts[piece]
+        opp_counts = self.counts[opp]
+        own_score = self.scores[piece] - CELL_CENTER_BONUS[index]
+        opp_score = self.scores[opp]
+        for w in CELL_WINDOW_IDS[index]:
+            a = own_counts[w]
+            o = opp_counts[w]
+            own_score += WINDOW_SCORES[a - 1][o] - WINDOW_SCORES[a][o]
+            opp_score += WINDOW_SCORES[o][a - 1] - WINDOW_SCORES[o][a]
+            own_counts[w] = a - 1
+        self.scores[piece] = own_score
+        self.scores[opp] = opp_score
+
+    def check(self, position):
+        # numpy is only needed for the cross-check
+        from engine.evaluation import score_position
+
+        board = position.to_array()
+        for piece in (PLAYER_PIECE, AI_PIECE):
+            expected = score_position(board, piece)
+            if self.scores[piece] != expected:
+                raise AssertionError(
+                    "incremental score %d != score_position %d for piece %d in %r"
+                    % (self.scores[piece], expected, piece, position)
+                )
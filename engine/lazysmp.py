@@ -0,0 +1,150 @@
+import math
+import multiprocessing
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from engine.bitboard import Position
+from engine.constants import AI_PIECE, COLUMN_COUNT, PLAYER_PIECE, ROW_COUNT
+from engine.incremental import IncrementalEvaluation
+from engine.ordering import CENTER_ORDER, MoveOrdering
+from engine.search import MOVE_TIME_BUDGET, Searcher, SearchTimeout
+from engine.transposition import TT_MEMORY_BYTES, SharedTranspositionTable
+
+# Per-helper-process state, set up by _init_helper
+_table = None
+_stop_flag = None
+
+
+def _init_helper(table_name, max_bytes, stop_flag):
+    global _table, _stop_flag
+    _table = SharedTranspositionTable(max_bytes, name=table_name)
+    _stop_flag = stop_flag
+
+
+def _helper_order(worker_id, search_id):
+    # Helpers disagree on the static column order so they explore the
+    # tree in different orders and fill the shared table with different
+    # positions. Odd helpers keep the center first.
+    order = list(CENTER_ORDER)
+    rng = random.Random(search_id * 1009 + worker_id)
+    if worker_id % 2:
+        tail = order[1:]
+        rng.shuffle(tail)
+        return order[:1] + tail
+    rng.shuffle(order)
+    return order
+
+
+def _helper_search(search_id, worker_id, player_mask, ai_mask, piece, time_budget, max_depth):
+    # Runs in a helper: iterative deepening on the shared table until the
+    # budget runs out or the main search sets the stop flag. Even helpers
+    # start one ply deeper than the main search.
+    _table.owner = worker_id
+    _table.reset_stats()
+    position = Position.from_masks(player_mask, ai_mask, IncrementalEvaluation())
+    searcher = Searcher(_table, MoveOrdering(static_order=_helper_order(worker_id, search_id)))
+    searcher.stop_flag = _stop_flag
+    searcher.deadline = time.perf_counter() + time_budget
+
+    depth = 1 + (worker_id + 1) % 2
+    completed_depth = 0
+    try:
+        while depth <= max_depth and not _stop_flag.value:
+            searcher.negamax(position, depth, -math.inf, math.inf, piece)
+            completed_depth = depth
+            depth += 1
+    except SearchTimeout:
+        pass
+
+    report = _table.stats()
+    report["worker"] = worker_id
+    report["nodes"] = searcher.nodes
+    report["completed_depth"] = completed_depth
+    return report
+
+
+class LazySMPSearcher:
+    # Lazy SMP: the main process runs the normal iterative deepening while
+    # helper processes search the same position at staggered depths and
+    # with different move orders. Nobody splits work explicitly; they only
+    # cooperate through a transposition table in shared memory, so the
+    # main search finds more of its tree already searched. The helper pool
+    # and the shared table are created once and reused across moves.
+
+    def __init__(self, helpers=None, max_bytes=TT_MEMORY_BYTES):
+        self.helpers = helpers if helpers is not None else max(1, (multiprocessing.cpu_count() or 2) - 1)
+        self.table = SharedTranspositionTable(max_bytes)
+        self.stop_flag = multiprocessing.Value("b", 0)
+        self.pool = None
+        if self.helpers:
+            self.pool = ProcessPoolExecutor(
+                max_workers=self.helpers,
+                initializer=_init_helper,
+                initargs=(self.table.name, max_bytes, self.stop_flag),
+            )
+        self.search_id = 0
+        self.last_report = None
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+        if self.table is not None:
+            self.table.close()
+            self.table = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def search(self, position, time_budget=MOVE_TIME_BUDGET, maximizingPlayer=True, max_depth=None):
+        # Same interface and result type as iterative_deepening
+        piece = AI_PIECE if maximizingPlayer else PLAYER_PIECE
+        if max_depth is None:
+            max_depth = ROW_COUNT * COLUMN_COUNT - position.move_count()
+        self.search_id += 1
+        self.stop_flag.value = 0
+        self.table.reset_stats()
+
+        futures = []
+        if self.pool is not None:
+            masks = (position.pieces[PLAYER_PIECE], position.pieces[AI_PIECE])
+            for worker_id in range(1, self.helpers + 1):
+                futures.append(self.pool.submit(
+                    _helper_search, self.search_id, worker_id, masks[0], masks[1], piece, time_budget, max_depth
+                ))
+
+        start = time.perf_counter()
+        searcher = Searcher(self.table)
+        try:
+            result = searcher.iterative_deepening(position, time_budget, maximizingPlayer, max_depth)
+        finally:
+            self.stop_flag.value = 1
+            helper_reports = [future.result() for future in futures]
+
+        main_report = self.table.stats()
+        main_report["worker"] = 0
+        main_report["nodes"] = searcher.nodes
+        main_report["completed_depth"] = searcher.completed_depth
+        self.last_report = {
+            "elapsed": time.perf_counter() - start,
+            "workers": [main_report] + helper_reports,
+        }
+        return result
+
+    def format_report(self):
+        if self.last_report is None:
+            return "no search yet"
+        lines = ["lazy smp: %.3fs" % self.last_report["elapsed"]]
+        for report in self.last_report["workers"]:
+            lines.append("  worker %d: nodes=%d depth=%d tt_hits=%.1f%% shared=%.1f%% of hits" % (
+                report["worker"],
+                report["nodes"],
+                report["completed_depth"],
+                100 * report["hit_rate"],
+                100 * report["shared_hit_rate"],
+            ))
+        return "\n".join(lines)
@@ -0,0 +1,201 @@
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import random
+import time
+
+from engine.constants import COLUMN_COUNT, ROW_COUNT
+from engine.server import DEFAULT_PORT, GameServer
+
+# Pause before retrying a move the server answered "busy", in seconds. It
+# doubles, with random jitter, on every busy answer in a row.
+BUSY_RETRY_DELAY = 0.01
+MAX_BUSY_RETRY_DELAY = 1.0
+
+
+class Client:
+    # One connection to a GameServer. Requests are pipelined: request()
+    # can be awaited by many tasks at once and each gets its own answer.
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.request_ids = itertools.count(1)
+        self.pending = {}
+        self.receiver = asyncio.create_task(self._receive())
+
+    @classmethod
+    async def connect(cls, host="127.0.0.1", port=DEFAULT_PORT, unix_path=None):
+        if unix_path:
+            reader, writer = await asyncio.open_unix_connection(unix_path)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def _receive(self):
+        try:
+            while True:
+                line = await self.reader.readline()
+                if not line:
+                    break
+                response = json.loads(line)
+                future = self.pending.pop(response.get("id"), None)
+                if future is not None and not future.done():
+                    future.set_result(response)
+        finally:
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("server closed the connection"))
+
+    async def request(self, **fields):
+        fields["id"] = next(self.request_ids)
+        future = asyncio.get_running_loop().create_future()
+        self.pending[fields["id"]] = future
+        self.writer.write(json.dumps(fields).encode() + b"\n")
+        await self.writer.drain()
+        return await future
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+        await self.receiver
+
+
+async def _request_retrying(client, rng, counts, **fields):
+    # Sends the request again, after a growing delay, while the server
+    # answers "busy"
+    retry_delay = BUSY_RETRY_DELAY
+    while True:
+        response = await client.request(**fields)
+        if response["ok"] or response["error"] != "busy":
+            return response
+        counts["busy"] += 1
+        await asyncio.sleep(retry_delay * rng.uniform(0.5, 1.5))
+        retry_delay = min(2 * retry_delay, MAX_BUSY_RETRY_DELAY)
+
+
+async def play_random_game(client, engine, budget, rng, latencies, counts):
+    # Plays random columns against the server's AI until the game ends,
+    # recording the time from sending each move until its answer,
+    # retries included
+    response = await _request_retrying(client, rng, counts, op="new", engine=engine, ai_first=rng.random() < 0.5)
+    if not response["ok"]:
+        counts["errors"] += 1
+        return
+    game = response["game"]
+    heights = [0] * COLUMN_COUNT
+    if response["ai_col"] is not None:
+        heights[response["ai_col"]] += 1
+    while response["winner"] is None:
+        col = rng.choice([c for c in range(COLUMN_COUNT) if heights[c] < ROW_COUNT])
+        request = {"op": "move", "game": game, "col": col}
+        if budget is not None:
+            request["budget"] = budget
+        start = time.perf_counter()
+        response = await _request_retrying(client, rng, counts, **request)
+        if not response["ok"]:
+            counts["errors"] += 1
+            break
+        latencies.append(time.perf_counter() - start)
+        counts["moves"] += 1
+        heights[col] += 1
+        if response["ai_col"] is not None:
+            heights[response["ai_col"]] += 1
+    else:
+        counts["games"] += 1
+    await client.request(op="close", game=game)
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)] if ordered else 0.0
+
+
+async def run_load(games, concurrency, connections=1, engine="id:0.05", budget=None, host="127.0.0.1",
+                   port=DEFAULT_PORT, unix_path=None, seed=0):
+    # Plays games random games against a running server, concurrency of
+    # them at a time spread over connections connections. Returns a report
+    # of move latencies and throughput.
+    clients = [await Client.connect(host, port, unix_path) for _ in range(connections)]
+    rng = random.Random(seed)
+    latencies = []
+    counts = {"games": 0, "moves": 0, "busy": 0, "errors": 0}
+    remaining = iter(range(games))
+
+    async def player(client, player_rng):
+        for _ in remaining:
+            await play_random_game(client, engine, budget, player_rng, latencies, counts)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        player(clients[i % connections], random.Random(rng.random())) for i in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - start
+    for client in clients:
+        await client.close()
+    return dict(
+        counts,
+        elapsed=elapsed,
+        moves_per_second=counts["moves"] / elapsed if elapsed else 0.0,
+        games_per_second=counts["games"] / elapsed if elapsed else 0.0,
+        latency_p50=percentile(latencies, 0.5),
+        latency_p99=percentile(latencies, 0.99),
+        latency_max=max(latencies, default=0.0),
+    )
+
+
+def format_report(report):
+    return "\n".join([
+        "%d games, %d moves in %.1fs: %.1f moves/s, %.1f games/s" % (
+            report["games"], report["moves"], report["elapsed"], report["moves_per_second"],
+            report["games_per_second"]),
+        "move latency: p50 %.1fms p99 %.1fms max %.1fms" % (
+            1000 * report["latency_p50"], 1000 * report["latency_p99"], 1000 * report["latency_max"]),
+        "busy answers %d, errors %d" % (report["busy"], report["errors"]),
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play random games against an engine.server to measure it.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", metavar="PATH")
+    parser.add_argument("--games", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50, help="games in progress at once")
+    parser.add_argument("--connections", type=int, default=10)
+    parser.add_argument("--engine", default="id:0.05", help="the server's engine, e.g. alphabeta:4")
+    parser.add_argument("--budget", type=float, help="per-move budget in seconds for id engines")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--serve", action="store_true", help="start a server in this process first")
+    parser.add_argument("--workers", type=int, default=None, help="with --serve: search processes")
+    args = parser.parse_args()
+
+    async def run():
+        server_task = None
+        server = None
+        if args.serve:
+            server = GameServer(args.workers)
+            listening = asyncio.get_running_loop().create_future()
+            server_task = asyncio.create_task(
+                server.serve(args.host, args.port, args.unix, lambda listener: listening.set_result(None))
+            )
+            await listening
+        try:
+            report = await run_load(
+                args.games, args.concurrency, args.connections, args.engine, args.budget,
+                args.host, args.port, args.unix, args.seed,
+            )
+        finally:
+            if server_task is not None:
+                server_task.cancel()
+                await asyncio.gather(server_task, return_exceptions=True)
+                server.close()
+        print(format_report(report))
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+import tracemalloc
+
+
+def measure_allocations(search, *args, **kwargs):
+    # Runs search(*args, **kwargs) under tracemalloc and reports what it
+    # allocated. A make/unmake search should show a small, depth-independent
+    # peak and next to no memory left behind once it returns.
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    before = tracemalloc.take_snapshot()
+    start_size = tracemalloc.get_traced_memory()[0]
+    try:
+        result = search(*args, **kwargs)
+        end_size, peak_size = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+
+    stats = after.compare_to(before, "filename")
+    report = {
+        "peak_bytes": peak_size - start_size,
+        "retained_bytes": end_size - start_size,
+        "retained_blocks": sum(max(stat.count_diff, 0) for stat in stats),
+    }
+    return result, report
+
+
+def format_allocations(report):
+    return "peak %.1f KiB, retained %.1f KiB, %d blocks" % (
+        report["peak_bytes"] / 1024,
+        report["retained_bytes"] / 1024,
+        report["retained_blocks"],
+    )
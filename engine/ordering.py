@@ -0,0 +1,84 @@
+from engine.bitboard import COLUMN_HEIGHT
+from engine.constants import COLUMN_COUNT, ROW_COUNT
+
+# Columns from the center outwards: center moves take part in the most windows
+CENTER_ORDER = sorted(range(COLUMN_COUNT), key=lambda col: abs(col - COLUMN_COUNT // 2))
+
+KILLERS_PER_PLY = 2
+
+# Sort keys: the hash/PV move goes first, then killers, then history
+_HASH_MOVE_BONUS = 1 << 40
+_KILLER_BONUS = 1 << 30
+
+
+class MoveOrdering:
+    # Orders the children of a node for alpha-beta. Each heuristic can be
+    # switched off, and a searcher accepts any object with the same
+    # order/record_cutoff/record_node methods.
+    #   center_first: static center-out column order (also the tie break),
+    #                 or static_order if given
+    #   hash_move: the transposition table / previous iteration best move
+    #   killers: the last two moves that caused a cutoff at the same ply
+    #   history: cutoff counts per (piece, cell), weighted by depth**2
+
+    def __init__(self, center_first=True, hash_move=True, killers=True, history=True, static_order=None):
+        self.center_first = center_first
+        self.use_hash_move = hash_move
+        self.use_killers = killers
+        self.use_history = history
+        self.static_rank = [0] * COLUMN_COUNT
+        if center_first:
+            for rank, col in enumerate(static_order or CENTER_ORDER):
+                self.static_rank[col] = COLUMN_COUNT - rank
+        self.killers = [[] for _ in range(ROW_COUNT * COLUMN_COUNT + 1)]
+        self.history = [[0] * (COLUMN_COUNT * COLUMN_HEIGHT) for _ in range(3)]
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.nodes = 0
+        self.cutoffs = 0
+        self.cutoffs_by_index = [0] * COLUMN_COUNT
+
+    def order(self, moves, position, piece, hash_move=None):
+        if not self.use_hash_move:
+            hash_move = None
+        killers = self.killers[position.move_count()] if self.use_killers else ()
+        history = self.history[piece] if self.use_history else None
+        heights = position.heights
+        static_rank = self.static_rank
+
+        def key(col):
+            if col == hash_move:
+                return _HASH_MOVE_BONUS
+            score = static_rank[col]
+            if col in killers:
+                score += _KILLER_BONUS
+            if history is not None:
+                score += history[col * COLUMN_HEIGHT + heights[col]] * 8
+            return score
+
+        return sorted(moves, key=key, reverse=True)
+
+    def record_node(self):
+        # Called once for every node that searched its children
+        self.nodes += 1
+
+    def record_cutoff(self, position, col, piece, depth, move_index):
+        # position is the node the cutoff happened in, before col is played
+        self.cutoffs += 1
+        self.cutoffs_by_index[move_index] += 1
+        if self.use_killers:
+            killers = self.killers[position.move_count()]
+            if col not in killers:
+                killers.insert(0, col)
+                del killers[KILLERS_PER_PLY:]
+        if self.use_history:
+            self.history[piece][col * COLUMN_HEIGHT + position.heights[col]] += depth * depth
+
+    def stats(self):
+        return {
+            "nodes": self.nodes,
+            "cutoffs": self.cutoffs,
+            "cutoffs_by_index": self.cutoffs_by_index[:],
+            "first_move_cutoff_rate": self.cutoffs_by_index[0] / self.cutoffs if self.cutoffs else 0.0,
+        }
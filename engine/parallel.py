@@ -0,0 +1,158 @@
+import argparse
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from engine.bitboard import Position
+from engine.constants import AI_PIECE, PLAYER_PIECE, other_piece
+from engine.incremental import IncrementalEvaluation
+from engine.ordering import MoveOrdering
+from engine.search import Searcher, is_terminal_node, minimax
+from engine.solver import should_solve
+from engine.transposition import TranspositionTable
+
+# Best root score found so far in the current search, shared by all workers
+_shared_alpha = None
+
+# Worker-local transposition table and the search it belongs to
+_table = None
+_table_search_id = None
+
+
+def _init_worker(shared_alpha):
+    global _shared_alpha
+    _shared_alpha = shared_alpha
+
+
+def _search_root_move(search_id, player_mask, ai_mask, col, depth, piece):
+    # Runs in a worker: plays col for piece and searches the reply with the
+    # best alpha any worker has found so far. Returns the score from
+    # piece's point of view and whether it is exact (above that alpha) or
+    # only an upper bound. The worker's table is shared by all root moves
+    # of one search and started afresh for the next, so results do not
+    # depend on what the worker searched before.
+    global _table, _table_search_id
+    if _table_search_id != search_id:
+        _table = TranspositionTable()
+        _table_search_id = search_id
+    position = Position.from_masks(player_mask, ai_mask, IncrementalEvaluation())
+    alpha = _shared_alpha.value
+    searcher = Searcher(_table)
+    position.make_move(col, piece)
+    score = -searcher.negamax(position, depth - 1, -math.inf, -alpha, other_piece(piece), col)[1]
+    exact = score > alpha
+    if exact:
+        with _shared_alpha.get_lock():
+            if score > _shared_alpha.value:
+                _shared_alpha.value = score
+    return col, score, exact, searcher.nodes
+
+
+class ParallelSearcher:
+    # Root-parallel alpha-beta. The first root move (center-out order) is
+    # searched alone to get a good alpha, then the remaining root moves are
+    # farmed out to a process pool; every finished move raises the shared
+    # alpha the following ones start from. The pool is created once and
+    # reused across moves.
+
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.shared_alpha = multiprocessing.Value("d", -math.inf)
+        self.pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(self.shared_alpha,),
+        )
+        self.nodes = 0
+        self.search_id = 0
+
+    def close(self):
+        self.pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def search(self, position, depth, maximizingPlayer=True):
+        # Same result as minimax(position, depth, -inf, inf, maximizingPlayer);
+        # the score is from the AI's point of view. Finished games and late
+        # positions, which minimax hands to the exact solver, are answered
+        # by minimax itself: (None, score) for a finished game.
+        self.nodes = 0
+        if should_solve(position) or is_terminal_node(position):
+            return minimax(position, depth, -math.inf, math.inf, maximizingPlayer)
+        piece = AI_PIECE if maximizingPlayer else PLAYER_PIECE
+        moves = MoveOrdering().order(position.valid_moves(), position, piece)
+        masks = (position.pieces[PLAYER_PIECE], position.pieces[AI_PIECE])
+        self.search_id += 1
+        self.shared_alpha.value = -math.inf
+
+        best_col = moves[0]
+        best_score = -math.inf
+
+        def submit(col):
+            return self.pool.submit(_search_root_move, self.search_id, masks[0], masks[1], col, depth, piece)
+
+        pending = {submit(moves[0])}
+        queued = list(moves[1:])
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                col, score, exact, nodes = future.result()
+                self.nodes += nodes
+                if exact and score > best_score:
+                    best_col = col
+                    best_score = score
+            # The eldest brother has finished, the rest can go in parallel
+            while queued and len(pending) < self.workers:
+                pending.add(submit(queued.pop(0)))
+
+        if maximizingPlayer:
+            return best_col, best_score
+        return best_col, -best_score
+
+
+def measure_speedup(position, depth, worker_counts, repeats=1, maximizingPlayer=True):
+    # Wall time of a root-parallel search for each worker count, relative
+    # to the first count in the list
+    results = []
+    for workers in worker_counts:
+        with ParallelSearcher(workers) as searcher:
+            searcher.search(position, 1, maximizingPlayer)  # Start the worker processes
+            best = math.inf
+            for _ in range(repeats):
+                start = time.perf_counter()
+                move = searcher.search(position, depth, maximizingPlayer)
+                best = min(best, time.perf_counter() - start)
+        results.append({"workers": workers, "seconds": best, "move": move, "nodes": searcher.nodes})
+    for result in results:
+        result["speedup"] = results[0]["seconds"] / result["seconds"]
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure root-parallel search speedup.")
+    parser.add_argument("--moves", default="4435", help="columns played so far, 1-based, e.g. 4435")
+    parser.add_argument("--depth", type=int, default=8)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    position = Position()
+    piece = PLAYER_PIECE
+    for move in args.moves:
+        position.make_move(int(move) - 1, piece)
+        piece = other_piece(piece)
+
+    results = measure_speedup(position, args.depth, args.workers, args.repeats, piece == AI_PIECE)
+    for result in results:
+        print("workers=%-3d time=%.3fs speedup=%.2fx nodes=%d move=%s" % (
+            result["workers"], result["seconds"], result["speedup"], result["nodes"], result["move"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import argparse
+import cProfile
+import glob
+import json
+import math
+import os
+import statistics
+import time
+import tracemalloc
+
+DEFAULT_PROFILE_DIRECTORY = "profiles"
+
+# Moves slower than this many seconds, measured while profiling, are kept
+PROFILE_THRESHOLD = 0.25
+
+# Captured moves kept in the directory; older ones are deleted
+PROFILE_KEEP = 200
+
+TOP_ALLOCATIONS = 10
+
+_TRACEMALLOC_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+)
+
+
+class MoveProfiler:
+    # Opt-in profiling of single AI moves. Every call to profile() runs
+    # under cProfile and tracemalloc, which slows it down roughly twofold;
+    # calls slower than threshold seconds are written to directory as
+    # NAME.prof (pstats format) and NAME.json (label, latency, memory peak
+    # and the top allocation sites still alive when the move returned).
+    # Only the newest `keep` captures are kept. Several processes can
+    # share a directory: names include the process id.
+
+    def __init__(self, directory=DEFAULT_PROFILE_DIRECTORY, threshold=PROFILE_THRESHOLD, keep=PROFILE_KEEP,
+                 top=TOP_ALLOCATIONS):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.threshold = threshold
+        self.keep = keep
+        self.top = top
+        self.moves = 0
+        self.captured = 0
+
+    def profile(self, label, search, *args, **kwargs):
+        # Returns search(*args, **kwargs). label describes the move in the
+        # capture, e.g. the position's move string.
+        was_tracing = tracemalloc.is_tracing()
+        if not was_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            return search(*args, **kwargs)
+        finally:
+            profiler.disable()
+            latency = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1] - before
+            snapshot = tracemalloc.take_snapshot() if latency >= self.threshold else None
+            if not was_tracing:
+                tracemalloc.stop()
+            self.moves += 1
+            if snapshot is not None:
+                self._save(label, profiler, snapshot, latency, peak)
+
+    def _save(self, label, profiler, snapshot, latency, peak):
+        self.captured += 1
+        name = "move-%s-%d-%04d" % (time.strftime("%Y%m%d-%H%M%S"), os.getpid(), self.captured)
+        path = os.path.join(self.directory, name)
+        profiler.dump_stats(path + ".prof")
+        top = snapshot.filter_traces(_TRACEMALLOC_FILTERS).statistics("lineno")[:self.top]
+        record = {
+            "label": label,
+            "latency": latency,
+            "peak_bytes": peak,
+            "top_allocations": [
+                {"site": "%s:%d" % (stat.traceback[0].filename, stat.traceback[0].lineno),
+                 "bytes": stat.size, "blocks": stat.count}
+                for stat in top
+            ],
+            "created": time.time(),
+        }
+        with open(path + ".json", "w") as record_file:
+            json.dump(record, record_file, indent=2)
+        self._rotate()
+
+    def _rotate(self):
+        records = sorted(glob.glob(os.path.join(self.directory, "move-*.json")), key=_mtime)
+        for record in records[:max(0, len(records) - self.keep)]:
+            for path in (record, record[:-len(".json")] + ".prof"):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass  # Another process rotated it first
+
+
+def _mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except FileNotFoundError:
+        return 0
+
+
+def load_records(directory=DEFAULT_PROFILE_DIRECTORY):
+    records = []
+    for path in sorted(glob.glob(os.path.join(directory, "move-*.json"))):
+        try:
+            with open(path) as record_file:
+                record = json.load(record_file)
+        except FileNotFoundError:
+            continue
+        record["profile"] = path[:-len(".json")] + ".prof"
+        records.append(record)
+    return records
+
+
+def summarize(directory=DEFAULT_PROFILE_DIRECTORY, top=20, sort="tottime"):
+    # Text report over every captured move in directory: latency and
+    # memory figures, the slowest moves, the hottest functions across all
+    # profiles added together and the largest allocation sites
+    import io
+    import pstats  # Only needed here; keeps profiled workers' startup short
+    records = [record for record in load_records(directory) if os.path.exists(record["profile"])]
+    if not records:
+        return "no captured moves in %s" % directory
+
+    latencies = sorted(record["latency"] for record in records)
+    peaks = [record["peak_bytes"] for record in records]
+    lines = [
+        "%d captured moves in %s" % (len(records), directory),
+        "latency: median %.3fs p95 %.3fs max %.3fs" % (
+            statistics.median(latencies), latencies[max(0, math.ceil(0.95 * len(latencies)) - 1)], latencies[-1]),
+        "memory peak: median %.1f KiB max %.1f KiB" % (statistics.median(peaks) / 1024, max(peaks) / 1024),
+        "",
+        "slowest moves:",
+    ]
+    for record in sorted(records, key=lambda record: record["latency"], reverse=True)[:5]:
+        lines.append("  %.3fs %s" % (record["latency"], record["label"]))
+
+    stream = io.StringIO()
+    stats = pstats.Stats(records[0]["profile"], stream=stream)
+    for record in records[1:]:
+        stats.add(record["profile"])
+    stats.files = []  # Skip the header line per profile file
+    stats.sort_stats(sort).print_stats(top)
+    lines += ["", "hotspots (%s):" % sort, stream.getvalue().strip()]
+
+    sites = {}
+    for record in records:
+        for allocation in record["top_allocations"]:
+            total = sites.setdefault(allocation["site"], [0, 0])
+            total[0] += allocation["bytes"]
+            total[1] += 1
+    lines += ["", "allocation sites (bytes summed over moves, moves seen in):"]
+    for site, (size, count) in sorted(sites.items(), key=lambda item: item[1][0], reverse=True)[:top]:
+        lines.append("  %10.1f KiB %5d  %s" % (size / 1024, count, site))
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize profiles of slow AI moves.")
+    parser.add_argument("directory", nargs="?", default=DEFAULT_PROFILE_DIRECTORY)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--sort", default="tottime", help="pstats sort key, e.g. tottime or cumulative")
+    args = parser.parse_args()
+    print(summarize(args.directory, args.top, args.sort))
+
+
+if __name__ == "__main__":
+    main()
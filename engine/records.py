@@ -0,0 +1,363 @@
+import argparse
+import os
+import struct
+from collections import namedtuple
+
+from engine.constants import AI_PIECE, COLUMN_COUNT, EMPTY, PLAYER_PIECE, ROW_COUNT, other_piece
+
+# Append-only file of finished games, for self-play output.
+# File layout: a header, then one record per game:
+#   varint       number of moves n (unsigned LEB128)
+#   (3n + 7) / 8 bytes of moves, 3 bits per column, first move in the
+#                lowest bits
+#   1 byte       result: winner (EMPTY for a draw, PLAYER_PIECE or
+#                AI_PIECE) in bits 0-1, the piece that moved first in
+#                bits 2-3
+# The index file beside it holds a header and then the 64-bit offset of
+# every game, so game N is found without reading the games before it.
+RECORD_MAGIC = b"C4GR"
+INDEX_MAGIC = b"C4GI"
+RECORD_VERSION = 1
+HEADER = struct.Struct("<4sH")  # magic, version; the same for both files
+OFFSET = struct.Struct("<Q")
+
+INDEX_SUFFIX = ".idx"
+DEFAULT_RECORD_PATH = "games.c4g"
+
+MOVE_BITS = 3
+CELLS = ROW_COUNT * COLUMN_COUNT
+MAX_GAME_BYTES = 1 + (CELLS * MOVE_BITS + 7) // 8 + 1
+
+# Bytes the writer collects before writing them out in one call, and the
+# reader's read size
+WRITE_BUFFER_BYTES = 1 << 16
+READ_CHUNK_BYTES = 1 << 16
+
+GameRecord = namedtuple("GameRecord", ["moves", "first", "winner"])
+
+
+def encode_varint(value, out):
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def decode_varint(data, offset):
+    # (value, offset after it), or None if data ends inside the varint
+    value = 0
+    shift = 0
+    while offset < len(data):
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+    return None
+
+
+def encode_game(moves, first, winner, out):
+    # Appends one game record to the bytearray out
+    packed = 0
+    for i, col in enumerate(moves):
+        if not 0 <= col < COLUMN_COUNT:
+            raise ValueError("invalid column %r" % (col,))
+        packed |= col << (MOVE_BITS * i)
+    encode_varint(len(moves), out)
+    out += packed.to_bytes((len(moves) * MOVE_BITS + 7) // 8, "little")
+    out.append(winner | first << 2)
+
+
+def decode_game(data, offset):
+    # (GameRecord, offset after it), or None if data ends inside the game
+    header = decode_varint(data, offset)
+    if header is None:
+        return None
+    count, offset = header
+    end = offset + (count * MOVE_BITS + 7) // 8
+    if end >= len(data):
+        return None
+    packed = int.from_bytes(data[offset:end], "little")
+    moves = [(packed >> (MOVE_BITS * i)) & 0x7 for i in range(count)]
+    result = data[end]
+    return GameRecord(moves, result >> 2, result & 0x3), end + 1
+
+
+def _check_header(header_bytes, magic, path):
+    if len(header_bytes) < HEADER.size or HEADER.unpack_from(header_bytes) != (magic, RECORD_VERSION):
+        raise ValueError("%s is not a version %d game %s" % (
+            path, RECORD_VERSION, "record file" if magic == RECORD_MAGIC else "index"))
+
+
+class GameRecordWriter:
+    # Appends games to a record file and its index, creating them if
+    # needed. Records collect in memory and reach the files in one write
+    # per buffer_size bytes, and on flush() and close().
+
+    def __init__(self, path=DEFAULT_RECORD_PATH, index_path=None, buffer_size=WRITE_BUFFER_BYTES):
+        self.index_path = index_path or path + INDEX_SUFFIX
+        self.buffer_size = buffer_size
+        self.buffer = bytearray()
+        self.index_buffer = bytearray()
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        if exists:
+            with open(path, "rb") as record_file:
+                _check_header(record_file.read(HEADER.size), RECORD_MAGIC, path)
+            if not _index_matches(path, self.index_path):
+                # A crash between the two files' writes: index what the
+                # file holds and drop a game cut off halfway
+                end = _write_index(path, self.index_path, complete_only=True)[1]
+                if os.path.getsize(path) > end:
+                    os.truncate(path, end)
+        self.file = open(path, "ab")
+        self.index_file = open(self.index_path, "ab" if exists else "wb")
+        if not exists:
+            self.file.write(HEADER.pack(RECORD_MAGIC, RECORD_VERSION))
+        if self.index_file.tell() == 0:
+            self.index_file.write(HEADER.pack(INDEX_MAGIC, RECORD_VERSION))
+        self.offset = self.file.tell()  # Where the next game starts
+        self.games = 0
+
+    def write_game(self, moves, first, winner):
+        # moves are columns from 0; first is the piece that made the first
+        # move and winner the winning piece, or EMPTY for a draw
+        self.index_buffer += OFFSET.pack(self.offset + len(self.buffer))
+        encode_game(moves, first, winner, self.buffer)
+        self.games += 1
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        # The games go out before their index entries, so an interrupted
+        # flush never leaves an index entry pointing past the file
+        self.file.write(self.buffer)
+        self.file.flush()
+        self.offset += len(self.buffer)
+        self.buffer.clear()
+        self.index_file.write(self.index_buffer)
+        self.index_file.flush()
+        self.index_buffer.clear()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+        self.index_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_games(path=DEFAULT_RECORD_PATH, start_offset=None, chunk_size=READ_CHUNK_BYTES):
+    # Yields every game in the file, from start_offset if given, reading
+    # chunk_size bytes at a time: only the current chunk is in memory
+    with open(path, "rb") as record_file:
+        _check_header(record_file.read(HEADER.size), RECORD_MAGIC, path)
+        if start_offset is not None:
+            record_file.seek(start_offset)
+        data = b""
+        offset = 0
+        while True:
+            chunk = record_file.read(chunk_size)
+            if not chunk:
+                break
+            data = data[offset:] + chunk
+            offset = 0
+            while True:
+                decoded = decode_game(data, offset)
+                if decoded is None:
+                    break
+                game, offset = decoded
+                yield game
+        if offset < len(data):
+            raise ValueError("%s ends inside a game" % path)
+
+
+def build_index(path=DEFAULT_RECORD_PATH, index_path=None):
+    # Writes the index of an existing record file; returns the game count
+    return _write_index(path, index_path or path + INDEX_SUFFIX)[0]
+
+
+def _write_index(path, index_path, complete_only=False):
+    # (game count, offset after the last game). With complete_only a file
+    # ending inside a game is indexed up to that game instead of raising.
+    offset = HEADER.size
+    count = 0
+    with open(index_path, "wb") as index_file:
+        index_file.write(HEADER.pack(INDEX_MAGIC, RECORD_VERSION))
+        entries = bytearray()
+        try:
+            for game in read_games(path):
+                entries += OFFSET.pack(offset)
+                offset += _encoded_size(game)
+                count += 1
+                if len(entries) >= WRITE_BUFFER_BYTES:
+                    index_file.write(entries)
+                    entries.clear()
+        except ValueError:
+            if not complete_only:
+                raise
+        index_file.write(entries)
+    return count, offset
+
+
+def _index_matches(path, index_path):
+    # Whether the index lists exactly the games in the record file: whole
+    # entries only, the last one pointing at a game that ends where the
+    # file ends
+    if not os.path.exists(index_path):
+        return False
+    entries_size = os.path.getsize(index_path) - HEADER.size
+    if entries_size < 0 or entries_size % OFFSET.size:
+        return False
+    with open(index_path, "rb") as index_file:
+        if index_file.read(HEADER.size) != HEADER.pack(INDEX_MAGIC, RECORD_VERSION):
+            return False
+        if not entries_size:
+            return os.path.getsize(path) == HEADER.size
+        index_file.seek(-OFFSET.size, os.SEEK_END)
+        last = OFFSET.unpack(index_file.read(OFFSET.size))[0]
+    if last < HEADER.size:
+        return False
+    with open(path, "rb") as record_file:
+        record_file.seek(last)
+        decoded = decode_game(record_file.read(MAX_GAME_BYTES), 0)
+    return decoded is not None and last + decoded[1] == os.path.getsize(path)
+
+
+def _encoded_size(game):
+    size = bytearray()
+    encode_varint(len(game.moves), size)
+    return len(size) + (len(game.moves) * MOVE_BITS + 7) // 8 + 1
+
+
+class GameRecordFile:
+    # Random access to a record file through its index: game(n) reads the
+    # nth offset and then that one game. Games appended after opening are
+    # not seen.
+
+    def __init__(self, path=DEFAULT_RECORD_PATH, index_path=None):
+        self.path = path
+        self.file = open(path, "rb")
+        try:
+            self.index_file = open(index_path or path + INDEX_SUFFIX, "rb")
+        except OSError:
+            self.file.close()
+            raise
+        try:
+            _check_header(self.file.read(HEADER.size), RECORD_MAGIC, path)
+            _check_header(self.index_file.read(HEADER.size), INDEX_MAGIC, self.index_file.name)
+        except ValueError:
+            self.close()
+            raise
+        self.count = (os.fstat(self.index_file.fileno()).st_size - HEADER.size) // OFFSET.size
+
+    def __len__(self):
+        return self.count
+
+    def offset(self, n):
+        if not 0 <= n < self.count:
+            raise IndexError("game %d of %d" % (n, self.count))
+        self.index_file.seek(HEADER.size + n * OFFSET.size)
+        return OFFSET.unpack(self.index_file.read(OFFSET.size))[0]
+
+    def game(self, n):
+        self.file.seek(self.offset(n))
+        decoded = decode_game(self.file.read(MAX_GAME_BYTES), 0)
+        if decoded is None:
+            raise ValueError("%s ends inside game %d" % (self.path, n))
+        return decoded[0]
+
+    def games(self, start=0):
+        # Streams the games from the nth on
+        if start >= self.count:
+            return iter(())
+        return read_games(self.path, self.offset(start))
+
+    def close(self):
+        self.file.close()
+        self.index_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def replay(game, board=None):
+    # Plays a game onto the GUI's NumPy board with drop_piece, yielding
+    # (board, row, col, piece) after each move. The same board is updated
+    # in place; pass one to reuse it across games.
+    from engine.board import create_board, drop_piece, get_next_open_row, is_valid_location  # Pulls in NumPy
+
+    if board is None:
+        board = create_board()
+    else:
+        board.fill(EMPTY)
+    piece = game.first
+    for col in game.moves:
+        if not is_valid_location(board, col):
+            raise ValueError("column %d is full" % col)
+        row = get_next_open_row(board, col)
+        drop_piece(board, row, col, piece)
+        yield board, row, col, piece
+        piece = other_piece(piece)
+
+
+def summarize(path=DEFAULT_RECORD_PATH):
+    # Game count, results and sizes for a record file, in one pass
+    counts = {EMPTY: 0, PLAYER_PIECE: 0, AI_PIECE: 0}
+    moves = 0
+    games = 0
+    for game in read_games(path):
+        games += 1
+        moves += len(game.moves)
+        counts[game.winner] += 1
+    size = os.path.getsize(path)
+    return {
+        "games": games,
+        "moves": moves,
+        "player_wins": counts[PLAYER_PIECE],
+        "ai_wins": counts[AI_PIECE],
+        "draws": counts[EMPTY],
+        "bytes": size,
+        "bytes_per_game": (size - HEADER.size) / games if games else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize a game record file or replay one of its games.")
+    parser.add_argument("path", nargs="?", default=DEFAULT_RECORD_PATH)
+    parser.add_argument("--game", type=int, metavar="N", help="replay game N, found through the index")
+    parser.add_argument("--reindex", action="store_true", help="rebuild the index file first")
+    args = parser.parse_args()
+
+    if args.reindex:
+        print("indexed %d games" % build_index(args.path))
+    if args.game is None:
+        report = summarize(args.path)
+        print("%d games, %d moves, %d bytes (%.1f per game)" % (
+            report["games"], report["moves"], report["bytes"], report["bytes_per_game"]))
+        print("player wins %d, AI wins %d, draws %d" % (report["player_wins"], report["ai_wins"], report["draws"]))
+        return
+
+    from engine.board import print_board
+
+    with GameRecordFile(args.path) as records:
+        game = records.game(args.game)
+    board = None
+    for board, row, col, piece in replay(game):
+        pass
+    print("moves %s, winner %s" % (
+        "".join(str(col + 1) for col in game.moves),
+        {EMPTY: "none", PLAYER_PIECE: "player", AI_PIECE: "AI"}[game.winner]))
+    if board is not None:
+        print_board(board)
+
+
+if __name__ == "__main__":
+    main()
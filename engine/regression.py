@@ -0,0 +1,127 @@
+import argparse
+import json
+import statistics
+import sys
+
+from engine.benchmark import ENGINES, run_benchmark
+
+DEFAULT_BASELINE_PATH = "benchmarks/baseline.json"
+
+# A case regresses when its median time grows, or its median nodes/sec
+# drops, by more than TOLERANCE plus the run-to-run noise of both runs:
+# NOISE_FACTOR times the median absolute deviation of each run's times,
+# relative to its median. Cases faster than MIN_TIME_SLACK seconds get
+# that much absolute slack on top.
+TOLERANCE = 0.25
+NOISE_FACTOR = 3
+MIN_TIME_SLACK = 0.002
+
+# Node counts at a fixed depth are deterministic; more than this much
+# growth means the search itself got worse
+NODE_TOLERANCE = 0.10
+
+
+def _case_key(result):
+    return result["position"], result["engine"], result["depth"]
+
+
+def _noise(result):
+    median = result["time_median"]
+    return statistics.median(abs(t - median) for t in result["times"]) / median
+
+
+def compare(baseline, current, tolerance=TOLERANCE):
+    # One row per benchmark case in current, with its baseline numbers
+    # and the list of checks it failed
+    baseline_results = {_case_key(result): result for result in baseline["results"]}
+    rows = []
+    for result in current["results"]:
+        base = baseline_results.get(_case_key(result))
+        row = {"case": _case_key(result), "current": result, "baseline": base, "failures": []}
+        rows.append(row)
+        if base is None:
+            continue
+        allowed = 1 + tolerance + NOISE_FACTOR * (_noise(base) + _noise(result))
+        if result["time_median"] > base["time_median"] * allowed + MIN_TIME_SLACK:
+            row["failures"].append("time")
+        # Same limit in nodes/sec terms, for this run's node count
+        expected_time = result["nodes"] / base["nps_median"]
+        if result["nps_median"] < result["nodes"] / (expected_time * allowed + MIN_TIME_SLACK):
+            row["failures"].append("nps")
+        if result["nodes"] > base["nodes"] * (1 + NODE_TOLERANCE):
+            row["failures"].append("nodes")
+    return rows
+
+
+def _change(current, base):
+    if not base:
+        return "    -"
+    return "%+5.0f%%" % (100 * (current / base - 1))
+
+
+def format_table(rows):
+    lines = ["%-12s %-9s %5s %10s %7s %10s %7s %9s %7s  %s" % (
+        "position", "engine", "depth", "time", "change", "nps", "change", "nodes", "change", "status")]
+    for row in rows:
+        position, engine, depth = row["case"]
+        current = row["current"]
+        base = row["baseline"]
+        if base is None:
+            status = "new"
+            time_change = nps_change = node_change = "    -"
+        else:
+            status = "REGRESSED (%s)" % ", ".join(row["failures"]) if row["failures"] else "ok"
+            time_change = _change(current["time_median"], base["time_median"])
+            nps_change = _change(current["nps_median"], base["nps_median"])
+            node_change = _change(current["nodes"], base["nodes"])
+        lines.append("%-12s %-9s %5d %9.4fs %7s %10.0f %7s %9d %7s  %s" % (
+            position, engine, depth, current["time_median"], time_change,
+            current["nps_median"], nps_change, current["nodes"], node_change, status))
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare a benchmark run against the committed baseline.")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH)
+    parser.add_argument("--current", help="benchmark JSON to check; runs the benchmark if omitted")
+    parser.add_argument("--engines", nargs="+", choices=list(ENGINES), help="defaults to the baseline's engines")
+    parser.add_argument("--repeats", type=int, help="defaults to the baseline's repeat count")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="allowed slowdown, e.g. 0.25")
+    parser.add_argument("--update", action="store_true", help="write the run as the new baseline instead")
+    args = parser.parse_args()
+
+    baseline = None
+    if not args.update:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+
+    if args.current:
+        with open(args.current) as current_file:
+            current = json.load(current_file)
+    else:
+        engines = args.engines
+        repeats = args.repeats
+        if baseline is not None:
+            baseline_engines = {result["engine"] for result in baseline["results"]}
+            engines = engines or [engine for engine in ENGINES if engine in baseline_engines]
+            repeats = repeats or baseline["repeats"]
+        current = run_benchmark(engines, repeats or 5)
+
+    if args.update:
+        with open(args.baseline, "w") as baseline_file:
+            json.dump(current, baseline_file, indent=2)
+        print("wrote %d results to %s" % (len(current["results"]), args.baseline))
+        return 0
+
+    rows = compare(baseline, current, args.tolerance)
+    print(format_table(rows))
+    regressions = sum(1 for row in rows if row["failures"])
+    if regressions:
+        print("%d of %d cases regressed" % (regressions, len(rows)))
+        return 1
+    print("no regressions in %d cases" % len(rows))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,431 @@
+import math
+import random
+import time
+
+from engine.constants import (
+    AI_PIECE,
+    AI_WIN_SCORE,
+    COLUMN_COUNT,
+    EMPTY,
+    PLAYER_PIECE,
+    PLAYER_WIN_SCORE,
+    ROW_COUNT,
+    other_piece,
+)
+from engine.transposition import (
+    EXACT,
+    LOWER_BOUND,
+    MAXIMIZING_KEY,
+    UPPER_BOUND,
+    get_transposition_table,
+)
+from engine.ordering import MoveOrdering
+from engine.solver import get_solver, should_solve, solve_position
+from engine.stats import SearchStats
+
+# Default time budget per AI move for iterative deepening, in seconds
+MOVE_TIME_BUDGET = 0.2
+
+# Half-width of the first aspiration window around the previous score. It
+# grows fourfold on every fail and becomes unbounded past ASPIRATION_MAX.
+ASPIRATION_WINDOW = 16
+ASPIRATION_MAX = 512
+
+# The clock is read once every TIME_CHECK_INTERVAL + 1 nodes
+TIME_CHECK_INTERVAL = 255
+
+# Picks the default column among equally scored moves. seed() makes
+# searches, and so their node counts, repeatable.
+_rng = random.Random()
+
+
+def seed(value=None):
+    _rng.seed(value)
+
+
+def get_valid_locations(position):
+    return position.valid_moves()
+
+
+def is_terminal_node(position, last_move=None):
+    if last_move is not None:
+        return position.winner_at(last_move) != EMPTY or position.is_full()
+    return position.is_win(PLAYER_PIECE) or position.is_win(AI_PIECE) or position.is_full()
+
+
+def _terminal_score(position, last_move):
+    # Score of a finished game. Children know the column just played, so
+    # only the lines through that piece are checked.
+    if last_move is not None:
+        winner = position.winner_at(last_move)
+    elif position.is_win(AI_PIECE):
+        winner = AI_PIECE
+    elif position.is_win(PLAYER_PIECE):
+        winner = PLAYER_PIECE
+    else:
+        winner = EMPTY
+
+    if winner == AI_PIECE:
+        return AI_WIN_SCORE
+    elif winner == PLAYER_PIECE:
+        return PLAYER_WIN_SCORE
+    return 0
+
+
+def minimax(position, depth, alpha, beta, maximizingPlayer, table=None, last_move=None, stats=None):
+    # Same search as the GUI minimax, but the children are visited by
+    # dropping into and undoing from a single bitboard position. The
+    # alpha-beta path (alpha and beta given) goes through the
+    # transposition table. last_move is the column just played into the
+    # position, if known, so the terminal check only scans its lines. Once
+    # few enough cells are empty the exact solver answers instead,
+    # whatever the depth. stats, a SearchStats, is filled in if given.
+    if stats is not None:
+        stats.start(position)
+    try:
+        if should_solve(position) and not is_terminal_node(position, last_move):
+            return _solve(position, maximizingPlayer, stats)
+        if alpha is not None and beta is not None:
+            return Searcher(table, stats=stats).alpha_beta(position, depth, alpha, beta, maximizingPlayer, last_move)
+        return _minimax(position, depth, maximizingPlayer, last_move, stats)
+    finally:
+        if stats is not None:
+            stats.stop()
+
+
+def _solve(position, maximizingPlayer, stats=None):
+    solver = get_solver()
+    nodes = solver.nodes
+    result = solve_position(position, maximizingPlayer, solver)
+    if stats is not None:
+        stats.solver_nodes += solver.nodes - nodes
+    return result
+
+
+def _minimax(position, depth, maximizingPlayer, last_move=None, stats=None):
+    # Plain minimax without pruning
+    valid_locations = position.valid_moves()
+    is_terminal = is_terminal_node(position, last_move)
+
+    if stats is not None:
+        ply = position.move_count() - stats.root_ply
+        stats.nodes_by_depth[ply] += 1
+        if ply > stats.max_depth:
+            stats.max_depth = ply
+        if is_terminal:
+            stats.terminal_hits += 1
+        elif depth == 0:
+            stats.leaf_evaluations += 1
+
+    if depth == 0 or is_terminal:
+        if is_terminal:
+            return (None, _terminal_score(position, last_move))
+        else:  # Depth is zero
+            return (None, position.score(AI_PIECE))
+
+    if maximizingPlayer:
+        value = -math.inf
+        column = _rng.choice(valid_locations)
+        for col in valid_locations:
+            position.make_move(col, AI_PIECE)
+            new_score = _minimax(position, depth - 1, False, col, stats)[1]
+            position.undo_move()
+            if new_score > value:
+                value = new_score
+                column = col
+
+        return column, value
+
+    else:  # Minimizing player
+        value = math.inf
+        column = _rng.choice(valid_locations)
+        for col in valid_locations:
+            position.make_move(col, PLAYER_PIECE)
+            new_score = _minimax(position, depth - 1, True, col, stats)[1]
+            position.undo_move()
+            if new_score < value:
+                value = new_score
+                column = col
+        return column, value
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class Searcher:
+    # Alpha-beta search state shared across the nodes of one search: the
+    # transposition table, the move ordering heuristics, the node counter
+    # and the optional deadline used by iterative deepening. stop_flag is
+    # an optional shared value that aborts the search like the deadline
+    # once it is set (checked on the same schedule). stats is an optional
+    # SearchStats to fill in; iteration_hooks are called with a progress
+    # record after every completed iterative deepening depth.
+
+    def __init__(self, table=None, ordering=None, stats=None):
+        self.table = table if table is not None else get_transposition_table()
+        self.ordering = ordering if ordering is not None else MoveOrdering()
+        self.stats = stats
+        self.iteration_hooks = []
+        self.nodes = 0
+        self.deadline = None
+        self.stop_flag = None
+        self.completed_depth = 0
+        self.aspiration_fail_lows = 0
+        self.aspiration_fail_highs = 0
+
+    def alpha_beta(self, position, depth, alpha, beta, maximizingPlayer, last_move=None, first_move=None):
+        # minimax-style entry point: alpha, beta and the returned score are
+        # from the AI's point of view
+        if self.stats is not None:
+            self.stats.start(position)
+        try:
+            if maximizingPlayer:
+                return self.negamax(position, depth, alpha, beta, AI_PIECE, last_move, first_move)
+            column, score = self.negamax(position, depth, -beta, -alpha, PLAYER_PIECE, last_move, first_move)
+            return column, -score
+        finally:
+            if self.stats is not None:
+                self.stats.stop()
+
+    def subscribe(self, callback):
+        # callback(record) after every completed iterative deepening depth.
+        # record has depth, move, score (AI's point of view), nodes,
+        # solver_nodes (when the exact solver answered instead) and elapsed
+        # seconds.
+        self.iteration_hooks.append(callback)
+
+    def negamax(self, position, depth, alpha, beta, piece, last_move=None, first_move=None):
+        # Principal variation search. Scores are from the point of view of
+        # piece, the side to move. The first child is searched with the full
+        # window, the rest with a null window around alpha and only
+        # re-searched if they beat it.
+        self.nodes += 1
+        if self.deadline is not None and self.nodes & TIME_CHECK_INTERVAL == 0:
+            if time.perf_counter() >= self.deadline or (self.stop_flag is not None and self.stop_flag.value):
+                raise SearchTimeout()
+
+        table = self.table
+        key = position.hash ^ MAXIMIZING_KEY if piece == AI_PIECE else position.hash
+        entry = table.probe(key)
+        stats = self.stats
+        if stats is not None:
+            ply = position.move_count() - stats.root_ply
+            stats.nodes_by_depth[ply] += 1
+            if ply > stats.max_depth:
+                stats.max_depth = ply
+            stats.tt_probes += 1
+            if entry is not None:
+                stats.tt_hits += 1
+        hash_move = None
+        if entry is not None:
+            hash_move = entry.move
+            if entry.depth >= depth:
+                if entry.flag == EXACT:
+                    return entry.move, entry.score
+                elif entry.flag == LOWER_BOUND:
+                    alpha = max(alpha, entry.score)
+                else:
+                    beta = min(beta, entry.score)
+                if alpha >= beta:
+                    return entry.move, entry.score
+
+        valid_locations = position.valid_moves()
+        is_terminal = is_terminal_node(position, last_move)
+
+        if depth == 0 or is_terminal:
+            sign = 1 if piece == AI_PIECE else -1
+            if is_terminal:
+                if stats is not None:
+                    stats.terminal_hits += 1
+                return (None, sign * _terminal_score(position, last_move))
+            else:  # Depth is zero
+                if stats is not None:
+                    stats.leaf_evaluations += 1
+                return (None, sign * position.score(AI_PIECE))
+
+        ordering = self.ordering
+        ordering.record_node()
+        valid_locations = ordering.order(
+            valid_locations, position, piece, first_move if first_move is not None else hash_move
+        )
+
+        opponent = other_piece(piece)
+        alpha_orig = alpha
+        value = -math.inf
+        column = _rng.choice(valid_locations)
+        for index, col in enumerate(valid_locations):
+            position.make_move(col, piece)
+            try:
+                if index == 0:
+                    score = -self.negamax(position, depth - 1, -beta, -alpha, opponent, col)[1]
+                else:
+                    score = -self.negamax(position, depth - 1, -alpha - 1, -alpha, opponent, col)[1]
+                    if alpha < score < beta:
+                        score = -self.negamax(position, depth - 1, -beta, -alpha, opponent, col)[1]
+            finally:
+                position.undo_move()
+            if score > value:
+                value = score
+                column = col
+
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                ordering.record_cutoff(position, col, piece, depth, index)
+                if stats is not None:
+                    stats.cutoffs_by_index[index] += 1
+                break
+
+        if value <= alpha_orig:
+            flag = UPPER_BOUND
+        elif value >= beta:
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+        table.store(key, depth, flag, value, column)
+        return column, value
+
+    def aspiration_search(self, position, depth, guess, piece, first_move=None):
+        # Searches a narrow window around the previous iteration's score and
+        # widens the side that failed until the score lands inside it
+        delta = ASPIRATION_WINDOW
+        alpha = guess - delta
+        beta = guess + delta
+        while True:
+            column, score = self.negamax(position, depth, alpha, beta, piece, first_move=first_move)
+            if score <= alpha:
+                self.aspiration_fail_lows += 1
+                alpha = score - delta if delta < ASPIRATION_MAX else -math.inf
+            elif score >= beta:
+                self.aspiration_fail_highs += 1
+                beta = score + delta if delta < ASPIRATION_MAX else math.inf
+            else:
+                return column, score
+            delta *= 4
+            first_move = column
+
+    def iterative_deepening(self, position, time_budget=MOVE_TIME_BUDGET, maximizingPlayer=True, max_depth=None):
+        # Searches depth 1, 2, 3... until time_budget seconds have passed and
+        # returns the result of the last depth that finished. Each
+        # iteration tries the previous iteration's best move first and,
+        # from depth 2 on, starts from an aspiration window around its
+        # score. Depth 1 always runs to completion so there is a move to
+        # return. Late positions go to the exact solver instead.
+        stats = self.stats
+        if stats is not None:
+            stats.start(position)
+        try:
+            return self._iterative_deepening(position, time_budget, maximizingPlayer, max_depth)
+        finally:
+            self.deadline = None
+            if stats is not None:
+                stats.stop()
+
+    def _iterative_deepening(self, position, time_budget, maximizingPlayer, max_depth):
+        start = time.perf_counter()
+        self.completed_depth = 0
+        self.aspiration_fail_lows = 0
+        self.aspiration_fail_highs = 0
+        empty_cells = ROW_COUNT * COLUMN_COUNT - position.move_count()
+        if should_solve(position) and not is_terminal_node(position):
+            solver_nodes = get_solver().nodes
+            best = _solve(position, maximizingPlayer, self.stats)
+            self.completed_depth = empty_cells
+            self._report_iteration(empty_cells, best, start, get_solver().nodes - solver_nodes)
+            return best
+        if max_depth is None or max_depth > empty_cells:
+            max_depth = empty_cells
+        piece = AI_PIECE if maximizingPlayer else PLAYER_PIECE
+        self.deadline = None
+
+        best = (None, 0)
+        depth = 1
+        while depth <= max_depth:
+            try:
+                if depth == 1:
+                    best = self.negamax(position, depth, -math.inf, math.inf, piece)
+                else:
+                    best = self.aspiration_search(position, depth, best[1], piece, best[0])
+            except SearchTimeout:
+                break
+            self.completed_depth = depth
+            if self.iteration_hooks or self.stats is not None:
+                self._report_iteration(depth, best if maximizingPlayer else (best[0], -best[1]), start)
+            if abs(best[1]) >= -PLAYER_WIN_SCORE:
+                break  # Forced result, searching deeper won't change it
+            if time_budget is not None:
+                self.deadline = start + time_budget
+                if time.perf_counter() >= self.deadline:
+                    break
+            depth += 1
+
+        if maximizingPlayer:
+            return best
+        return best[0], -best[1]
+
+    def _report_iteration(self, depth, best, start, solver_nodes=0):
+        # best is (column, score from the AI's point of view)
+        record = {
+            "depth": depth,
+            "move": best[0],
+            "score": best[1],
+            "nodes": self.nodes,
+            "solver_nodes": solver_nodes,
+            "elapsed": time.perf_counter() - start,
+        }
+        if self.stats is not None:
+            self.stats.iterations.append(record)
+        for hook in self.iteration_hooks:
+            hook(record)
+
+
+def iterative_deepening(position, time_budget=MOVE_TIME_BUDGET, maximizingPlayer=True, max_depth=None, table=None,
+                        stats=None, on_iteration=None):
+    searcher = Searcher(table, stats=stats)
+    if on_iteration is not None:
+        searcher.subscribe(on_iteration)
+    return searcher.iterative_deepening(position, time_budget, maximizingPlayer, max_depth)
+
+
+def search_with_stats(position, time_budget=MOVE_TIME_BUDGET, maximizingPlayer=True, max_depth=None, table=None,
+                      on_iteration=None):
+    # iterative_deepening that also returns its SearchStats:
+    # (column, score, stats)
+    stats = SearchStats()
+    column, score = iterative_deepening(position, time_budget, maximizingPlayer, max_depth, table, stats, on_iteration)
+    return column, score, stats
+
+
+def principal_variation(position, piece, table=None, max_length=None):
+    # The expected line from position with piece to move, read back from
+    # the transposition table by following each position's stored move.
+    # Stops at the first position the table has no move for.
+    table = table if table is not None else get_transposition_table()
+    position = position.copy()
+    line = []
+    while max_length is None or len(line) < max_length:
+        key = position.hash ^ MAXIMIZING_KEY if piece == AI_PIECE else position.hash
+        entry = table.probe(key)
+        if entry is None or entry.move is None or not position.can_play(entry.move):
+            break
+        position.make_move(entry.move, piece)
+        line.append(entry.move)
+        if position.winner_at(entry.move) != EMPTY or position.is_full():
+            break
+        piece = other_piece(piece)
+    return line
+
+
+def pick_best_move(position, piece):
+    valid_locations = position.valid_moves()
+    best_score = -10000
+    best_col = _rng.choice(valid_locations)
+    for col in valid_locations:
+        position.make_move(col, piece)
+        score = position.score(piece)
+        position.undo_move()
+        if score > best_score:
+            best_score = score
+            best_col = col
+
+    return best_col
@@ -0,0 +1,335 @@
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from engine.bitboard import Position, cell_bit
+from engine.board import create_board, drop_piece, get_next_open_row, is_valid_location, winning_move_at
+from engine.constants import AI_PIECE, COLUMN_COUNT, EMPTY, PLAYER_PIECE, ROW_COUNT
+from engine.incremental import IncrementalEvaluation
+from engine.tournament import choose_move, parse_engine
+from engine.transposition import TranspositionTable
+
+# Line-delimited JSON over TCP or a Unix socket. Each request is one JSON
+# object on one line and gets one response line; "id" is echoed back so a
+# client can pipeline requests and match the answers. A connection can
+# hold any number of games.
+#   {"op": "new", "engine": "id:0.05", "ai_first": false}
+#       -> {"ok": true, "game": 1, "moves": "", "ai_col": null, "winner": null}
+#   {"op": "move", "game": 1, "col": 3, "budget": 0.05}
+#       plays the player's col, then the AI's reply (budget, in seconds,
+#       overrides the time of an "id" engine for this move)
+#       -> {"ok": true, "game": 1, "moves": "44", "ai_col": 3, "winner": null,
+#           "search_seconds": 0.05, "queue_seconds": 0.0}
+#   {"op": "close", "game": 1} -> {"ok": true}
+#   {"op": "ping"} -> {"ok": true}
+# Columns count from 0, "moves" lists every move from 1 as in
+# Position's repr, and "winner" is "player", "ai", "draw" or null. Errors
+# come back as {"ok": false, "error": "..."}; "busy" means the server
+# is shedding load and the request can be retried.
+DEFAULT_PORT = 7777
+DEFAULT_ENGINE = "id:0.05"
+
+# Longest AI move a request may ask for, in seconds
+MAX_MOVE_BUDGET = 5.0
+
+# Deepest fixed-depth engines a client may ask for. Each stays well
+# inside MAX_MOVE_BUDGET from the opening on, where these searches are
+# slowest (minimax:6 takes over a second, alphabeta:12 about four).
+MAX_ENGINE_DEPTH = {"minimax": 5, "alphabeta": 10}
+
+# AI moves handed to the pool at once, per worker. Requests beyond that
+# wait in the server; beyond MAX_QUEUED waiting they are answered "busy".
+PENDING_PER_WORKER = 2
+MAX_QUEUED = 1024
+
+# Requests a connection may have in progress before the server stops
+# reading from it, which pushes back on the client through TCP
+MAX_CONNECTION_REQUESTS = 64
+
+# Per-worker transposition table, kept across requests: entries are keyed
+# by the whole position, so games share them safely
+WORKER_TABLE_BYTES = 16 * 1024 * 1024
+
+_table = None
+
+
+def _search_move(player_mask, ai_mask, engine, seed):
+    # Runs in a pool worker. Returns the AI's column and the search time.
+    global _table
+    if _table is None:
+        _table = TranspositionTable(WORKER_TABLE_BYTES)
+    position = Position.from_masks(player_mask, ai_mask, IncrementalEvaluation())
+    start = time.perf_counter()
+    col = choose_move(engine, position, AI_PIECE, _table, random.Random(seed))
+    return col, time.perf_counter() - start
+
+
+class RequestError(Exception):
+    pass
+
+
+class GameSession:
+    # One game on the GUI's NumPy board; the player is PLAYER_PIECE and
+    # the server plays AI_PIECE
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.board = create_board()
+        self.moves = []
+        self.winner = None
+        self.masks = [0, 0, 0]
+        self.lock = asyncio.Lock()  # One move at a time per game
+
+    def play(self, col, piece):
+        if self.winner is not None:
+            raise RequestError("game is over")
+        if type(col) is not int or not 0 <= col < COLUMN_COUNT or not is_valid_location(self.board, col):
+            raise RequestError("invalid column %r" % (col,))
+        row = get_next_open_row(self.board, col)
+        drop_piece(self.board, row, col, piece)
+        self.masks[piece] |= cell_bit(row, col)
+        self.moves.append(col)
+        if winning_move_at(self.board, row, col, piece):
+            self.winner = "player" if piece == PLAYER_PIECE else "ai"
+        elif len(self.moves) == ROW_COUNT * COLUMN_COUNT:
+            self.winner = "draw"
+
+    def undo(self):
+        # Takes back the last move, e.g. a player's move whose AI reply failed
+        col = self.moves.pop()
+        row = get_next_open_row(self.board, col)
+        row = ROW_COUNT - 1 if row is None else row - 1
+        piece = int(self.board[row][col])
+        drop_piece(self.board, row, col, EMPTY)
+        self.masks[piece] &= ~cell_bit(row, col)
+        self.winner = None
+
+    def state(self):
+        return {"moves": "".join(str(col + 1) for col in self.moves), "winner": self.winner}
+
+
+class GameServer:
+    # Hosts games for any number of connections on one event loop. AI
+    # moves run on a process pool; at most workers * PENDING_PER_WORKER
+    # are in the pool at a time, so a burst of requests queues here (up to
+    # max_queued) instead of in the pool.
+
+    def __init__(self, workers=None, max_queued=MAX_QUEUED, max_budget=MAX_MOVE_BUDGET):
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        self.pool_slots = asyncio.Semaphore(self.workers * PENDING_PER_WORKER)
+        self.max_queued = max_queued
+        self.max_budget = max_budget
+        self.queued = 0
+        self.game_ids = itertools.count(1)
+        self.sessions = 0
+        self.moves = 0
+        self.rejected = 0
+        self.connections = {}  # Handler task -> its connection's writer
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+    def _check_engine(self, engine):
+        # Engines come from clients, so their cost is bounded here
+        kind, arg = engine
+        if kind == "id" and not 0 < arg <= self.max_budget:
+            raise RequestError("id engine seconds must be between 0 and %g" % self.max_budget)
+        if kind in MAX_ENGINE_DEPTH and not 1 <= arg <= MAX_ENGINE_DEPTH[kind]:
+            raise RequestError("%s depth must be between 1 and %d" % (kind, MAX_ENGINE_DEPTH[kind]))
+        return engine
+
+    def _move_engine(self, session, budget):
+        # The engine for the AI's next move. Checked before the request
+        # changes the game, so a refused request leaves it untouched.
+        engine = session.engine
+        if budget is not None:
+            if engine[0] != "id":
+                raise RequestError("budget needs an id engine")
+            if not isinstance(budget, (int, float)) or not 0 < budget <= self.max_budget:
+                raise RequestError("budget must be between 0 and %g seconds" % self.max_budget)
+            engine = ("id", float(budget))
+        if self.queued >= self.max_queued:
+            self.rejected += 1
+            raise RequestError("busy")
+        return engine
+
+    async def ai_move(self, session, engine):
+        queued_at = time.perf_counter()
+        self.queued += 1
+        try:
+            await self.pool_slots.acquire()
+        finally:
+            self.queued -= 1
+        queue_seconds = time.perf_counter() - queued_at
+        try:
+            col, search_seconds = await asyncio.get_running_loop().run_in_executor(
+                self.pool, _search_move, session.masks[PLAYER_PIECE], session.masks[AI_PIECE], engine,
+                random.random(),
+            )
+        finally:
+            self.pool_slots.release()
+        session.play(col, AI_PIECE)
+        self.moves += 1
+        return {"ai_col": col, "search_seconds": search_seconds, "queue_seconds": queue_seconds}
+
+    async def handle_request(self, request, games):
+        op = request.get("op")
+        if op == "ping":
+            return {}
+        if op == "new":
+            spec = request.get("engine", DEFAULT_ENGINE)
+            if not isinstance(spec, str):
+                raise RequestError("engine must be a string such as %r" % DEFAULT_ENGINE)
+            try:
+                engine = parse_engine(spec)
+            except ValueError as error:
+                raise RequestError(str(error))
+            self._check_engine(engine)
+            session = GameSession(engine)
+            game_id = next(self.game_ids)
+            response = {"game": game_id, "ai_col": None}
+            if request.get("ai_first"):
+                engine = self._move_engine(session, request.get("budget"))
+                response.update(await self.ai_move(session, engine))
+            games[game_id] = session
+            self.sessions += 1
+            response.update(session.state())
+            return response
+
+        game_id = request.get("game")
+        session = games.get(game_id)
+        if session is None:
+            raise RequestError("unknown game %r" % (game_id,))
+        if op == "close":
+            del games[game_id]
+            self.sessions -= 1
+            return {}
+        if op == "move":
+            async with session.lock:
+                engine = self._move_engine(session, request.get("budget"))
+                session.play(request.get("col"), PLAYER_PIECE)
+                response = {"game": game_id, "ai_col": None}
+                if session.winner is None:
+                    try:
+                        response.update(await self.ai_move(session, engine))
+                    except BaseException:
+                        # No reply was played: take the player's move back so
+                        # the game stays in turn and the move can be retried
+                        session.undo()
+                        raise
+                response.update(session.state())
+            return response
+        raise RequestError("unknown op %r" % (op,))
+
+    async def _respond(self, line, games, writer, write_lock, slots):
+        request_id = None
+        try:
+            try:
+                request = json.loads(line)
+            except ValueError as error:
+                raise RequestError("bad JSON: %s" % error)
+            if not isinstance(request, dict):
+                raise RequestError("request must be a JSON object")
+            request_id = request.get("id")
+            response = await self.handle_request(request, games)
+            response["ok"] = True
+        except RequestError as error:
+            response = {"ok": False, "error": str(error)}
+        except Exception as error:  # E.g. a broken pool; the client still gets an answer
+            response = {"ok": False, "error": "internal error: %r" % error}
+        finally:
+            slots.release()
+        if request_id is not None:
+            response["id"] = request_id
+        async with write_lock:
+            writer.write(json.dumps(response).encode() + b"\n")
+            await writer.drain()
+
+    async def handle_connection(self, reader, writer):
+        # Requests on one connection run concurrently (moves of the same
+        # game are serialized by the game's lock); the connection's games
+        # are dropped when it closes
+        games = {}
+        write_lock = asyncio.Lock()
+        slots = asyncio.Semaphore(MAX_CONNECTION_REQUESTS)
+        tasks = set()
+        self.connections[asyncio.current_task()] = writer
+        try:
+            while True:
+                await slots.acquire()
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    slots.release()
+                    continue
+                task = asyncio.create_task(self._respond(line, games, writer, write_lock, slots))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            pass  # Client went away or sent an over-long line
+        finally:
+            for task in tasks:
+                task.cancel()
+            self.sessions -= len(games)
+            del self.connections[asyncio.current_task()]
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=DEFAULT_PORT, unix_path=None, ready=None):
+        # Serves until cancelled. ready(server), if given, is called once
+        # the socket is listening.
+        if unix_path:
+            server = await asyncio.start_unix_server(self.handle_connection, unix_path)
+        else:
+            server = await asyncio.start_server(self.handle_connection, host, port)
+        if ready is not None:
+            ready(server)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            # Closing a connection ends its handler as if the client had
+            # hung up, once the moves in progress are answered
+            handlers = list(self.connections)
+            for writer in self.connections.values():
+                writer.close()
+            await asyncio.gather(*handlers, return_exceptions=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve Connect Four games over line-delimited JSON.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", metavar="PATH", help="listen on a Unix socket instead of TCP")
+    parser.add_argument("--workers", type=int, default=None, help="search processes, defaults to every core")
+    parser.add_argument("--max-queued", type=int, default=MAX_QUEUED, help="waiting AI moves before answering busy")
+    args = parser.parse_args()
+
+    async def run():
+        server = GameServer(args.workers, args.max_queued)
+
+        def ready(listener):
+            where = args.unix or "%s:%d" % (args.host, args.port)
+            print("serving on %s with %d workers" % (where, server.workers))
+
+        try:
+            await server.serve(args.host, args.port, args.unix, ready)
+        finally:
+            server.close()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
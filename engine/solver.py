@@ -0,0 +1,220 @@
+from array import array
+
+from engine.bitboard import BOARD_MASK, BOTTOM_MASK, COLUMN_HEIGHT
+from engine.constants import AI_PIECE, AI_WIN_SCORE, COLUMN_COUNT, PLAYER_PIECE, PLAYER_WIN_SCORE, ROW_COUNT
+from engine.ordering import CENTER_ORDER
+
+# The AI switches from the heuristic search to the exact solver once this
+# few cells are left empty. Solving 16 empty cells takes a few
+# milliseconds, well inside the easiest move time budget.
+SOLVER_EMPTY_CELLS = 16
+
+SOLVER_TABLE_BYTES = 8 * 1024 * 1024
+
+CELLS = ROW_COUNT * COLUMN_COUNT
+_MIN_SCORE = -(CELLS // 2)
+
+_BOTTOM = [1 << (col * COLUMN_HEIGHT) for col in range(COLUMN_COUNT)]
+_TOP = [1 << (col * COLUMN_HEIGHT + ROW_COUNT - 1) for col in range(COLUMN_COUNT)]
+_COLUMN = [((1 << ROW_COUNT) - 1) << (col * COLUMN_HEIGHT) for col in range(COLUMN_COUNT)]
+
+
+def winning_cells(current, mask):
+    # Empty cells (reachable or not) that would give current four in a row
+    # vertical
+    r = (current << 1) & (current << 2) & (current << 3)
+
+    # horizontal and both diagonals
+    for shift in (COLUMN_HEIGHT, COLUMN_HEIGHT - 1, COLUMN_HEIGHT + 1):
+        p = (current << shift) & (current << 2 * shift)
+        r |= p & (current << 3 * shift)
+        r |= p & (current >> shift)
+        p = (current >> shift) & (current >> 2 * shift)
+        r |= p & (current << shift)
+        r |= p & (current >> 3 * shift)
+
+    return r & (BOARD_MASK ^ mask)
+
+
+def _previous_prime(n):
+    # Largest prime <= n. A prime table size spreads the structured
+    # current + mask keys over the slots.
+    while n > 2:
+        if n % 2 and all(n % d for d in range(3, int(n ** 0.5) + 1, 2)):
+            return n
+        n -= 1
+    return 2
+
+
+class SolverTable:
+    # The solver's own table, Pascal Pons style: one upper bound per slot,
+    # always replaced. Keys (current + mask, under 2**49) are stored whole,
+    # so two positions can share a slot but never an entry. Bounds are
+    # kept offset so a stored 0 means an empty slot.
+
+    def __init__(self, max_bytes=SOLVER_TABLE_BYTES):
+        self.size = _previous_prime(max(2, max_bytes // 9))
+        self.keys = array("Q", bytes(8 * self.size))
+        self.values = bytearray(self.size)
+
+    def get(self, key):
+        # The stored upper bound for key, or None
+        i = key % self.size
+        value = self.values[i]
+        if value and self.keys[i] == key:
+            return value + _MIN_SCORE - 1
+        return None
+
+    def put(self, key, upper):
+        i = key % self.size
+        self.keys[i] = key
+        self.values[i] = upper - _MIN_SCORE + 1
+
+    def clear(self):
+        self.values = bytearray(self.size)
+
+
+class Solver:
+    # Exact solver for the side to move. The position is kept Pascal
+    # Pons style as two integers: current (the side to move's pieces) and
+    # mask (all pieces). Scores count distance to the end: a win with the
+    # side's k-th remaining stone scores (CELLS + 1 - moves) // 2 where
+    # moves is the number of stones played at that point, a draw is 0 and
+    # losses mirror wins. The root value is found with null-window
+    # searches that bisect the possible score range.
+
+    def __init__(self, table=None):
+        self.table = table if table is not None else SolverTable()
+        self.nodes = 0
+
+    def negamax(self, current, mask, moves, alpha, beta):
+        self.nodes += 1
+        possible = (mask + BOTTOM_MASK) & BOARD_MASK
+        if winning_cells(current, mask) & possible:
+            return (CELLS + 1 - moves) // 2
+
+        # Moves that do not hand the opponent a win
+        opponent_wins = winning_cells(current ^ mask, mask)
+        forced = possible & opponent_wins
+        if forced:
+            if forced & (forced - 1):
+                return -((CELLS - moves) // 2)  # Two threats, cannot block both
+            possible = forced
+        playable = possible & ~(opponent_wins >> 1)
+        if not playable:
+            return -((CELLS - moves) // 2)
+
+        if moves >= CELLS - 2:
+            return 0  # Neither side can win with the last two stones
+
+        lower = -((CELLS - 2 - moves) // 2)
+        if alpha < lower:
+            alpha = lower
+            if alpha >= beta:
+                return alpha
+
+        upper = (CELLS - 1 - moves) // 2
+        key = current + mask
+        stored = self.table.get(key)
+        if stored is not None:
+            upper = stored
+        if beta > upper:
+            beta = upper
+            if alpha >= beta:
+                return beta
+
+        # Try moves that create the most new threats first
+        candidates = []
+        for col in CENTER_ORDER:
+            move = playable & _COLUMN[col]
+            if move:
+                threats = winning_cells(current | move, mask).bit_count()
+                candidates.append((threats, move))
+        candidates.sort(key=lambda item: item[0], reverse=True)
+
+        opponent = current ^ mask
+        for _, move in candidates:
+            score = -self.negamax(opponent, mask | move, moves + 1, -beta, -alpha)
+            if score >= beta:
+                return score
+            if score > alpha:
+                alpha = score
+
+        self.table.put(key, alpha)
+        return alpha
+
+    def solve(self, current, mask, moves):
+        # Exact score of the position for the side to move
+        possible = (mask + BOTTOM_MASK) & BOARD_MASK
+        if winning_cells(current, mask) & possible:
+            return (CELLS + 1 - moves) // 2
+
+        low = -((CELLS - moves) // 2)
+        high = (CELLS + 1 - moves) // 2
+        while low < high:
+            med = low + (high - low) // 2
+            # Probe nearer zero first: short wins and losses are rarer
+            if med <= 0 and int(low / 2) < med:
+                med = int(low / 2)
+            elif med >= 0 and high // 2 > med:
+                med = high // 2
+            score = self.negamax(current, mask, moves, med, med + 1)
+            if score <= med:
+                high = score
+            else:
+                low = score
+        return low
+
+    def best_move(self, current, mask, moves):
+        # (column, score) for the side to move: the first column whose child
+        # reaches the solved value
+        value = self.solve(current, mask, moves)
+        for col in CENTER_ORDER:
+            if mask & _TOP[col]:
+                continue
+            move = (mask + _BOTTOM[col]) & _COLUMN[col]
+            if winning_cells(current, mask) & move:
+                return col, (CELLS + 1 - moves) // 2
+            # Null window: does this child hold the opponent to -value?
+            child = self.negamax(current ^ mask, mask | move, moves + 1, -value, -value + 1)
+            if -child >= value:
+                return col, value
+        return None, value
+
+
+def to_engine_score(score, piece):
+    # Maps a solver score for piece to the minimax scale (AI's point of
+    # view): wins stay beyond the terminal scores, sooner wins score higher
+    if piece == PLAYER_PIECE:
+        score = -score
+    if score > 0:
+        return AI_WIN_SCORE + score
+    if score < 0:
+        return PLAYER_WIN_SCORE + score
+    return 0
+
+
+_solver = None
+
+
+def get_solver():
+    # The solver's table keys are exact positions, so one solver is kept
+    # across moves and games
+    global _solver
+    if _solver is None:
+        _solver = Solver()
+    return _solver
+
+
+def solve_position(position, maximizingPlayer=True, solver=None):
+    # Exact best move and game-theoretic value of a Position, scored like
+    # minimax. The game must not be over yet.
+    piece = AI_PIECE if maximizingPlayer else PLAYER_PIECE
+    mask = position.pieces[PLAYER_PIECE] | position.pieces[AI_PIECE]
+    solver = solver if solver is not None else get_solver()
+    col, score = solver.best_move(position.pieces[piece], mask, position.move_count())
+    return col, to_engine_score(score, piece)
+
+
+def should_solve(position, empty_cells=SOLVER_EMPTY_CELLS):
+    return ROW_COUNT * COLUMN_COUNT - position.move_count() <= empty_cells
@@ -0,0 +1,89 @@
+import argparse
+import multiprocessing
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Modules a worker or a test would import; the GUI last, for comparison
+STARTUP_MODULES = ("engine", "engine.board", "engine.tournament", "connect4WithMenu")
+
+# Run in a fresh interpreter: import time, peak RSS in KiB (Linux units)
+# and whether the import pulled in numpy or pygame
+_IMPORT_PROBE = """
+import resource, sys, time
+start = time.perf_counter()
+%s
+elapsed = time.perf_counter() - start
+print(elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, "numpy" in sys.modules, "pygame" in sys.modules)
+"""
+
+
+def measure_import(module, repeats=5):
+    # Median import seconds and RSS over repeats fresh interpreters. module
+    # None measures a bare interpreter.
+    statement = "import %s" % module if module else "pass"
+    times = []
+    rss = []
+    for _ in range(repeats):
+        output = subprocess.run(
+            [sys.executable, "-c", _IMPORT_PROBE % statement], capture_output=True, text=True, check=True
+        ).stdout.split()[-4:]
+        times.append(float(output[0]))
+        rss.append(int(output[1]))
+    return {
+        "module": module or "(interpreter)",
+        "import_seconds": statistics.median(times),
+        "rss_kib": statistics.median(rss),
+        "numpy": output[2] == "True",
+        "pygame": output[3] == "True",
+    }
+
+
+def _first_task():
+    # What a tournament worker does first: import the engine and search
+    import resource
+    from engine.bitboard import Position
+    from engine.search import minimax
+
+    minimax(Position(), 2, None, None, True)
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def measure_worker(method, repeats=5):
+    # Median seconds from creating a one-process pool with the given start
+    # method until its first search returns, and the worker's peak RSS
+    context = multiprocessing.get_context(method)
+    times = []
+    rss = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            rss.append(pool.submit(_first_task).result())
+            times.append(time.perf_counter() - start)
+    return {"method": method, "first_task_seconds": statistics.median(times), "rss_kib": statistics.median(rss)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import time and memory of the engine and its workers.")
+    parser.add_argument("--modules", nargs="+", default=list(STARTUP_MODULES))
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    print("%-20s %10s %10s  %s" % ("import", "time", "rss", "loads"))
+    for module in [None] + args.modules:
+        result = measure_import(module, args.repeats)
+        loads = ", ".join(name for name in ("numpy", "pygame") if result[name]) or "-"
+        print("%-20s %8.1fms %7.1fMiB  %s" % (
+            result["module"], 1000 * result["import_seconds"], result["rss_kib"] / 1024, loads))
+
+    print()
+    print("%-20s %10s %10s" % ("worker start", "first task", "rss"))
+    for method in multiprocessing.get_all_start_methods():
+        result = measure_worker(method, args.repeats)
+        print("%-20s %8.1fms %7.1fMiB" % (method, 1000 * result["first_task_seconds"], result["rss_kib"] / 1024))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import time
+
+from engine.constants import COLUMN_COUNT, ROW_COUNT
+
+
+class SearchStats:
+    # Counters a search fills in when it is given one. Searches without a
+    # SearchStats only pay for an `is None` check per node.
+    #   nodes_by_depth: nodes visited per ply below the root
+    #   leaf_evaluations: depth-0 nodes scored with the heuristic
+    #   terminal_hits: nodes where the game was over
+    #   cutoffs_by_index: beta cutoffs by the index of the move causing them
+    #   tt_probes, tt_hits: transposition table lookups and entries found
+    #   max_depth: deepest ply reached
+    #   solver_nodes: nodes of the exact solver, when the search handed off
+    #   iterations: one record per completed iterative deepening depth
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.nodes_by_depth = [0] * (ROW_COUNT * COLUMN_COUNT + 1)
+        self.leaf_evaluations = 0
+        self.terminal_hits = 0
+        self.cutoffs_by_index = [0] * COLUMN_COUNT
+        self.tt_probes = 0
+        self.tt_hits = 0
+        self.max_depth = 0
+        self.solver_nodes = 0
+        self.iterations = []
+        self.elapsed = 0.0
+        self.root_ply = 0
+        self._start = None
+        self._active = 0
+
+    def start(self, position):
+        # Called by a search at its root; plies count from position. Nested
+        # searches (an entry point calling another) keep the outer root.
+        if not self._active:
+            self.root_ply = position.move_count()
+            self._start = time.perf_counter()
+        self._active += 1
+
+    def stop(self):
+        self._active -= 1
+        if not self._active:
+            self.elapsed += time.perf_counter() - self._start
+
+    @property
+    def nodes(self):
+        return sum(self.nodes_by_depth)
+
+    @property
+    def cutoffs(self):
+        return sum(self.cutoffs_by_index)
+
+    @property
+    def tt_hit_rate(self):
+        return self.tt_hits / self.tt_probes if self.tt_probes else 0.0
+
+    def as_dict(self):
+        depth = len(self.nodes_by_depth)
+        while depth and not self.nodes_by_depth[depth - 1]:
+            depth -= 1
+        return {
+            "nodes": self.nodes,
+            "nodes_by_depth": self.nodes_by_depth[:depth],
+            "leaf_evaluations": self.leaf_evaluations,
+            "terminal_hits": self.terminal_hits,
+            "cutoffs": self.cutoffs,
+            "cutoffs_by_index": self.cutoffs_by_index[:],
+            "tt_probes": self.tt_probes,
+            "tt_hits": self.tt_hits,
+            "tt_hit_rate": self.tt_hit_rate,
+            "max_depth": self.max_depth,
+            "solver_nodes": self.solver_nodes,
+            "iterations": [dict(iteration) for iteration in self.iterations],
+            "elapsed": self.elapsed,
+        }
+
+    def format(self):
+        return "nodes=%d leaves=%d terminals=%d cutoffs=%d tt=%d/%d max_depth=%d solver_nodes=%d %.3fs" % (
+            self.nodes,
+            self.leaf_evaluations,
+            self.terminal_hits,
+            self.cutoffs,
+            self.tt_hits,
+            self.tt_probes,
+            self.max_depth,
+            self.solver_nodes,
+            self.elapsed,
+        )
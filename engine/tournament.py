@@ -0,0 +1,270 @@
+import argparse
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from engine.bitboard import Position
+from engine.constants import AI_PIECE, PLAYER_PIECE, other_piece
+from engine.incremental import IncrementalEvaluation
+from engine.profiling import PROFILE_THRESHOLD, MoveProfiler
+from engine.records import GameRecordWriter
+from engine import search as engine_search
+from engine.search import Searcher, minimax, pick_best_move
+from engine.transposition import TranspositionTable
+
+# Engine specs: "random", "greedy", "minimax:DEPTH" (no pruning),
+# "alphabeta:DEPTH" and "id:SECONDS" (iterative deepening on a time budget)
+ENGINE_KINDS = ("random", "greedy", "minimax", "alphabeta", "id")
+
+# Transposition table per engine per game, so games do not depend on the
+# games a worker played before
+GAME_TABLE_BYTES = 4 * 1024 * 1024
+
+# Normal quantile for the 95% confidence intervals
+CONFIDENCE_Z = 1.96
+
+# Per-worker MoveProfiler when profiling is on, see _get_profiler
+_profiler = None
+
+
+def _get_profiler(directory, threshold):
+    global _profiler
+    if _profiler is None:
+        _profiler = MoveProfiler(directory, threshold)
+    return _profiler
+
+
+def parse_engine(spec):
+    # "alphabeta:5" -> ("alphabeta", 5). Raises ValueError on a bad spec.
+    kind, _, arg = spec.partition(":")
+    if kind not in ENGINE_KINDS:
+        raise ValueError("unknown engine %r, expected one of %s" % (spec, ", ".join(ENGINE_KINDS)))
+    if kind in ("random", "greedy"):
+        if arg:
+            raise ValueError("engine %r takes no argument" % kind)
+        return kind, None
+    if not arg:
+        raise ValueError("engine %r needs an argument, e.g. %s:%s" % (kind, kind, "0.05" if kind == "id" else "4"))
+    return kind, float(arg) if kind == "id" else int(arg)
+
+
+def choose_move(engine, position, piece, table, rng):
+    kind, arg = engine
+    maximizingPlayer = piece == AI_PIECE
+    if kind == "random":
+        return rng.choice(position.valid_moves())
+    if kind == "greedy":
+        return pick_best_move(position, piece)
+    if kind == "minimax":
+        return minimax(position, arg, None, None, maximizingPlayer)[0]
+    if kind == "alphabeta":
+        return minimax(position, arg, -math.inf, math.inf, maximizingPlayer, table)[0]
+    return Searcher(table).iterative_deepening(position, arg, maximizingPlayer)[0]
+
+
+def play_game(game_id, engine_a, engine_b, seed=0, opening_plies=2, profile_directory=None,
+              profile_threshold=PROFILE_THRESHOLD):
+    # Plays one game and returns its record, with the result from engine
+    # A's side: 1 win, 0.5 draw, 0 loss. Games come in pairs that share a
+    # random opening; A moves first in the even game of each pair. With a
+    # profile_directory every engine move is profiled and slow ones kept.
+    opening_rng = random.Random(seed * 1000003 + game_id // 2)
+    rng = random.Random(seed * 1000003 + game_id)
+    engine_search.seed(rng.random())  # Tie breaks inside minimax
+
+    engines = {AI_PIECE: engine_a, PLAYER_PIECE: engine_b}
+    tables = {
+        piece: TranspositionTable(GAME_TABLE_BYTES) if engine[0] in ("alphabeta", "id") else None
+        for piece, engine in engines.items()
+    }
+    move_times = {AI_PIECE: [], PLAYER_PIECE: []}
+    piece = first = AI_PIECE if game_id % 2 == 0 else PLAYER_PIECE
+    position = Position(IncrementalEvaluation())
+    winner = None
+    profiler = _get_profiler(profile_directory, profile_threshold) if profile_directory else None
+
+    while winner is None:
+        if position.move_count() < opening_plies:
+            col = opening_rng.choice(position.valid_moves())
+        else:
+            start = time.perf_counter()
+            if profiler is not None:
+                label = "game %d %s:%s %r" % (game_id, engines[piece][0], engines[piece][1], position)
+                col = profiler.profile(label, choose_move, engines[piece], position, piece, tables[piece], rng)
+            else:
+                col = choose_move(engines[piece], position, piece, tables[piece], rng)
+            move_times[piece].append(time.perf_counter() - start)
+        position.make_move(col, piece)
+        if position.winner_at(col):
+            winner = piece
+        elif position.is_full():
+            winner = 0
+        piece = other_piece(piece)
+
+    return {
+        "game": game_id,
+        "result": 0.5 if winner == 0 else float(winner == AI_PIECE),
+        "moves": position.move_count(),
+        "columns": list(position.moves),
+        "first": first,
+        "winner": winner,
+        "move_times_a": move_times[AI_PIECE],
+        "move_times_b": move_times[PLAYER_PIECE],
+    }
+
+
+def wilson_interval(successes, trials, z=CONFIDENCE_Z):
+    if not trials:
+        return 0.0, 1.0
+    p = successes / trials
+    center = (p + z * z / (2 * trials)) / (1 + z * z / trials)
+    half = z * math.sqrt(p * (1 - p) / trials + z * z / (4 * trials * trials)) / (1 + z * z / trials)
+    return max(0.0, center - half), min(1.0, center + half)
+
+
+def elo_difference(score):
+    if score <= 0:
+        return -math.inf
+    if score >= 1:
+        return math.inf
+    return -400 * math.log10(1 / score - 1)
+
+
+def summarize(games, elapsed, z=CONFIDENCE_Z):
+    # Win/draw/loss counts for engine A with confidence intervals, plus
+    # timing, from a list of play_game records
+    n = len(games)
+    results = [game["result"] for game in games]
+    wins = results.count(1.0)
+    draws = results.count(0.5)
+    losses = n - wins - draws
+    score = sum(results) / n if n else 0.0
+    variance = sum(r * r for r in results) / n - score * score if n else 0.0
+    margin = z * math.sqrt(max(variance, 0.0) / n) if n else 0.0
+    low, high = max(0.0, score - margin), min(1.0, score + margin)
+
+    times_a = [t for game in games for t in game["move_times_a"]]
+    times_b = [t for game in games for t in game["move_times_b"]]
+    cpu = sum(times_a) + sum(times_b)
+    return {
+        "games": n,
+        "wins": wins,
+        "draws": draws,
+        "losses": losses,
+        "win_rate": wins / n if n else 0.0,
+        "win_interval": wilson_interval(wins, n, z),
+        "draw_rate": draws / n if n else 0.0,
+        "draw_interval": wilson_interval(draws, n, z),
+        "loss_rate": losses / n if n else 0.0,
+        "loss_interval": wilson_interval(losses, n, z),
+        "score": score,
+        "score_interval": (low, high),
+        "elo": elo_difference(score),
+        "elo_interval": (elo_difference(low), elo_difference(high)),
+        "elapsed": elapsed,
+        "games_per_second": n / elapsed if elapsed else 0.0,
+        "mean_game_length": sum(game["moves"] for game in games) / n if n else 0.0,
+        "search_seconds": cpu,
+        "mean_move_time_a": sum(times_a) / len(times_a) if times_a else 0.0,
+        "max_move_time_a": max(times_a, default=0.0),
+        "mean_move_time_b": sum(times_b) / len(times_b) if times_b else 0.0,
+        "max_move_time_b": max(times_b, default=0.0),
+    }
+
+
+def run_tournament(engine_a, engine_b, games, workers=None, seed=0, opening_plies=2, progress=None,
+                   profile_directory=None, profile_threshold=PROFILE_THRESHOLD, record_path=None):
+    # Plays games between two engine specs on a process pool and returns
+    # the summarize() report. progress(done, elapsed) is called as games
+    # finish. Move times include the profiler's overhead when profiling.
+    # With a record_path the games are appended there as they finish, in
+    # finishing order, engine A playing AI_PIECE.
+    engine_a = parse_engine(engine_a) if isinstance(engine_a, str) else engine_a
+    engine_b = parse_engine(engine_b) if isinstance(engine_b, str) else engine_b
+    workers = workers or os.cpu_count() or 1
+    records = []
+    writer = GameRecordWriter(record_path) if record_path else None
+    start = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(
+                    play_game, game_id, engine_a, engine_b, seed, opening_plies, profile_directory, profile_threshold
+                )
+                for game_id in range(games)
+            ]
+            for future in as_completed(futures):
+                records.append(future.result())
+                if writer is not None:
+                    writer.write_game(records[-1]["columns"], records[-1]["first"], records[-1]["winner"])
+                if progress is not None:
+                    progress(len(records), time.perf_counter() - start)
+    finally:
+        # Keeps the games that finished even if one failed
+        if writer is not None:
+            writer.close()
+    records.sort(key=lambda game: game["game"])
+    return summarize(records, time.perf_counter() - start)
+
+
+def format_report(report, name_a="A", name_b="B"):
+    def interval(bounds, scale=100, fmt="%.1f"):
+        return "[" + fmt % (bounds[0] * scale) + ", " + fmt % (bounds[1] * scale) + "]"
+
+    lines = [
+        "%s vs %s: %d games" % (name_a, name_b, report["games"]),
+        "  wins   %5d  %5.1f%% %s" % (report["wins"], 100 * report["win_rate"], interval(report["win_interval"])),
+        "  draws  %5d  %5.1f%% %s" % (report["draws"], 100 * report["draw_rate"], interval(report["draw_interval"])),
+        "  losses %5d  %5.1f%% %s" % (report["losses"], 100 * report["loss_rate"], interval(report["loss_interval"])),
+        "  score  %.3f %s  elo %+.0f %s" % (
+            report["score"],
+            interval(report["score_interval"], 1, "%.3f"),
+            report["elo"],
+            interval(report["elo_interval"], 1, "%+.0f"),
+        ),
+        "  %.1fs wall, %.1f games/s, %.1f moves/game, %.1fs searching" % (
+            report["elapsed"], report["games_per_second"], report["mean_game_length"], report["search_seconds"]),
+        "  move time %s: mean %.2fms max %.2fms" % (
+            name_a, 1000 * report["mean_move_time_a"], 1000 * report["max_move_time_a"]),
+        "  move time %s: mean %.2fms max %.2fms" % (
+            name_b, 1000 * report["mean_move_time_b"], 1000 * report["max_move_time_b"]),
+    ]
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play engines against each other without a window.")
+    parser.add_argument("--engine-a", default="id:0.05", help="random, greedy, minimax:D, alphabeta:D or id:SECONDS")
+    parser.add_argument("--engine-b", default="random")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=None, help="processes, defaults to every core")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--opening-plies", type=int, default=2, help="random moves at the start of each game pair")
+    parser.add_argument("--profile", metavar="DIRECTORY", help="profile every move, keep the slow ones here")
+    parser.add_argument("--profile-threshold", type=float, default=PROFILE_THRESHOLD, help="seconds")
+    parser.add_argument("--record", metavar="PATH", help="append the games to this game record file")
+    args = parser.parse_args()
+
+    try:
+        engine_a = parse_engine(args.engine_a)
+        engine_b = parse_engine(args.engine_b)
+    except ValueError as error:
+        parser.error(str(error))
+
+    step = max(1, args.games // 10)
+
+    def progress(done, elapsed):
+        if done % step == 0:
+            print("%d/%d games, %.1fs" % (done, args.games, elapsed))
+
+    report = run_tournament(
+        engine_a, engine_b, args.games, args.workers, args.seed, args.opening_plies, progress,
+        args.profile, args.profile_threshold, args.record,
+    )
+    print(format_report(report, args.engine_a, args.engine_b))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+import random
+from collections import namedtuple
+
+from engine.constants import COLUMN_COUNT, ROW_COUNT
+
+# Zobrist keys: one random 64-bit number per (piece, bit index) of the
+# bitboard, plus one for the side to move. Seeded so hashes are stable
+# between runs and processes.
+_rng = random.Random(0xC0FFEE)
+ZOBRIST_KEYS = [
+    [_rng.getrandbits(64) for _ in range(COLUMN_COUNT * (ROW_COUNT + 1))]
+    for _piece in range(3)
+]
+MAXIMIZING_KEY = _rng.getrandbits(64)
+del _rng
+
+# Bound types
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+# Default memory cap for the table used by minimax
+TT_MEMORY_BYTES = 16 * 1024 * 1024
+
+# Each slot is a 64-bit key, a 64-bit score and one byte each for depth,
+# bound type and best move
+SLOT_BYTES = 8 + 8 + 1 + 1 + 1
+SLOTS_PER_BUCKET = 2
+NO_MOVE = -1
+
+# Set in the bound type byte of every filled slot. Keys are stored whole,
+# so every key value, 0 included (the empty board with the player to
+# move), is a real key and cannot mark an empty slot.
+OCCUPIED = 0x4
+FLAG_MASK = 0x3
+
+TTEntry = namedtuple("TTEntry", ["depth", "flag", "score", "move"])
+
+
+class TranspositionTable:
+    # Fixed-size table of two-slot buckets. Slot 0 is depth-preferred and
+    # only replaced by a search at least as deep (or by the same position);
+    # slot 1 is always replaced. Storage is a single flat buffer so the
+    # memory used is exactly what max_bytes allows.
+
+    def __init__(self, max_bytes=TT_MEMORY_BYTES, buffer=None):
+        self.bucket_count = max(1, max_bytes // (SLOT_BYTES * SLOTS_PER_BUCKET))
+        slots = self.bucket_count * SLOTS_PER_BUCKET
+        self.size_bytes = slots * SLOT_BYTES
+        if buffer is None:
+            buffer = bytearray(self.size_bytes)
+        view = memoryview(buffer)
+        offset = 0
+        self.keys = view[offset:offset + slots * 8].cast("Q")
+        offset += slots * 8
+        self.scores = view[offset:offset + slots * 8].cast("q")
+        offset += slots * 8
+        self.depths = view[offset:offset + slots].cast("b")
+        offset += slots
+        self.flags = view[offset:offset + slots].cast("b")
+        offset += slots
+        self.moves = view[offset:offset + slots].cast("b")
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+        self.collisions = 0
+
+    def clear(self):
+        for i in range(len(self.keys)):
+            self.keys[i] = 0
+            self.flags[i] = 0
+        self.reset_stats()
+
+    def probe(self, key):
+        self.probes += 1
+        slot = (key % self.bucket_count) * SLOTS_PER_BUCKET
+        keys = self.keys
+        flags = self.flags
+        for i in (slot, slot + 1):
+            if keys[i] == key and flags[i]:
+                self.hits += 1
+                move = self.moves[i]
+                return TTEntry(self.depths[i], flags[i] & FLAG_MASK, self.scores[i],
+                               None if move == NO_MOVE else move)
+        if flags[slot] or flags[slot + 1]:
+            # The bucket is in use by other positions
+            self.collisions += 1
+        return None
+
+    def store(self, key, depth, flag, score, move):
+        self.stores += 1
+        slot = (key % self.bucket_count) * SLOTS_PER_BUCKET
+        keys = self.keys
+        if not self.flags[slot] or keys[slot] == key or depth >= self.depths[slot]:
+            i = slot
+        else:
+            i = slot + 1
+        keys[i] = key
+        self.depths[i] = depth
+        self.flags[i] = flag | OCCUPIED
+        self.scores[i] = score
+        self.moves[i] = NO_MOVE if move is None else move
+
+    def used_slots(self):
+        # Scans the whole table, tens of milliseconds at the default size:
+        # for offline diagnostics, not per-move reports
+        return sum(1 for flag in self.flags if flag)
+
+    def stats(self):
+        # Counters since reset_stats(); cheap enough to read every move
+        return {
+            "probes": self.probes,
+            "hits": self.hits,
+            "hit_rate": self.hits / self.probes if self.probes else 0.0,
+            "stores": self.stores,
+            "collisions": self.collisions,
+            "capacity": self.bucket_count * SLOTS_PER_BUCKET,
+            "size_bytes": self.size_bytes,
+        }
+
+
+def _pack(depth, flag, score, move):
+    # 64-bit digest of an entry's data, XORed into the stored key
+    return (score & 0xFFFFFFFFFFFF) | (depth & 0xFF) << 48 | (flag & 0x3) << 56 | (move & 0x3F) << 58
+
+
+def _attach_shared_memory(name):
+    # Attaching processes are children of the creator and share its
+    # resource tracker, which already knows the block; the creator unlinks it
+    from multiprocessing import shared_memory  # Not at the top: slow to import, and rarely needed
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+class SharedTranspositionTable(TranspositionTable):
+    # Transposition table in multiprocessing.shared_memory, written by
+    # several processes without locks. Each slot stores key XOR
+    # _pack(data), so a slot torn by two concurrent writers fails the check
+    # on probe and reads as a miss. An extra byte per slot records which
+    # process wrote it, to count hits on other processes' work.
+    # Create it once with name=None and attach from the other processes
+    # with the same max_bytes and the creator's name.
+
+    def __init__(self, max_bytes=TT_MEMORY_BYTES, name=None, owner=0):
+        bucket_count = max(1, max_bytes // ((SLOT_BYTES + 1) * SLOTS_PER_BUCKET))
+        slots = bucket_count * SLOTS_PER_BUCKET
+        table_bytes = slots * SLOT_BYTES
+        if name is None:
+            from multiprocessing import shared_memory
+            self.shm = shared_memory.SharedMemory(create=True, size=table_bytes + slots)
+            self.created = True
+        else:
+            self.shm = _attach_shared_memory(name)
+            self.created = False
+        self.name = self.shm.name
+        self.owner = owner
+        super().__init__(table_bytes, buffer=self.shm.buf)
+        self.owners = self.shm.buf[table_bytes:table_bytes + slots].cast("B")
+        self.size_bytes = table_bytes + slots
+
+    def reset_stats(self):
+        super().reset_stats()
+        self.shared_hits = 0
+
+    def close(self):
+        # Views must be released before the block can be closed
+        for view in (self.keys, self.scores, self.depths, self.flags, self.moves, self.owners):
+            view.release()
+        self.shm.close()
+        if self.created:
+            self.shm.unlink()
+
+    def _lookup(self, i, key):
+        flag = self.flags[i]
+        if not flag:
+            return None
+        stored = self.keys[i]
+        flag &= FLAG_MASK
+        depth = self.depths[i]
+        score = self.scores[i]
+        move = self.moves[i]
+        if stored ^ _pack(depth, flag, score, move) != key:
+            return None
+        return TTEntry(depth, flag, score, None if move == NO_MOVE else move)
+
+    def probe(self, key):
+        self.probes += 1
+        slot = (key % self.bucket_count) * SLOTS_PER_BUCKET
+        for i in (slot, slot + 1):
+            entry = self._lookup(i, key)
+            if entry is not None:
+                self.hits += 1
+                if self.owners[i] != self.owner:
+                    self.shared_hits += 1
+                return entry
+        if self.flags[slot] or self.flags[slot + 1]:
+            self.collisions += 1
+        return None
+
+    def store(self, key, depth, flag, score, move):
+        self.stores += 1
+        slot = (key % self.bucket_count) * SLOTS_PER_BUCKET
+        if (not self.flags[slot] or depth >= self.depths[slot]
+                or self._lookup(slot, key) is not None):
+            i = slot
+        else:
+            i = slot + 1
+        move = NO_MOVE if move is None else move
+        self.depths[i] = depth
+        self.flags[i] = flag | OCCUPIED
+        self.scores[i] = score
+        self.moves[i] = move
+        self.owners[i] = self.owner
+        self.keys[i] = key ^ _pack(depth, flag, score, move)
+
+    def stats(self):
+        stats = super().stats()
+        stats["shared_hits"] = self.shared_hits
+        stats["shared_hit_rate"] = self.shared_hits / self.hits if self.hits else 0.0
+        return stats
+
+
+_default_table = None
+
+
+def get_transposition_table():
+    # Created on first use so importing the engine stays cheap
+    global _default_table
+    if _default_table is None:
+        _default_table = TranspositionTable()
+    return _default_table
+
+
+def set_transposition_table(table):
+    global _default_table
+    _default_table = table
@@ -0,0 +1,254 @@
+import math
+import sys
+import threading
+from types import SimpleNamespace
+
+from engine.bitboard import Position
+from engine.constants import (
+    AI_PIECE,
+    AI_WIN_SCORE,
+    COLUMN_COUNT,
+    EMPTY,
+    PLAYER_PIECE,
+    PLAYER_WIN_SCORE,
+    ROW_COUNT,
+    other_piece,
+)
+from engine.incremental import IncrementalEvaluation
+from engine.search import MOVE_TIME_BUDGET, Searcher, get_valid_locations, principal_variation
+from engine.solver import should_solve, solve_position
+from engine.transposition import TT_MEMORY_BYTES, TranspositionTable
+
+# Line protocol on stdin/stdout, modelled on UCI, for tournament managers
+# and scripts. Columns are written 1 to 7 and a position is the string of
+# moves from the empty board, the player moving first, as in Position's
+# repr ("4435").
+#   uci                            -> id lines, then uciok
+#   isready                        -> readyok
+#   setoption name Hash value MB   resizes the transposition table
+#   ucinewgame                     clears the table and move ordering
+#   position [startpos] [moves] 4435
+#   go depth N | go movetime MS | go infinite   (plain go: MOVE_TIME_BUDGET)
+#       -> info depth D score cp S nodes N nps X time MS pv 4 4 3, once
+#          per completed depth, then bestmove C
+#   stop                           ends the search early, bestmove follows
+#   quit
+# Scores are from the side to move. Decided games print "score mate N":
+# the side to move wins in N of its moves, or loses with N negative.
+# Problems print "info string ..." and the command is ignored.
+ENGINE_NAME = "Connect Four bitboard engine"
+ENGINE_AUTHOR = "Connect-Four-Ai-agent"
+
+CELLS = ROW_COUNT * COLUMN_COUNT
+
+
+def parse_moves(moves):
+    # (position, piece to move) after a move string; raises ValueError on
+    # an illegal move
+    position = Position(IncrementalEvaluation())
+    piece = PLAYER_PIECE
+    for move in moves:
+        if not move.isdigit() or not 1 <= int(move) <= COLUMN_COUNT:
+            raise ValueError("bad move %r" % move)
+        col = int(move) - 1
+        if col not in get_valid_locations(position):
+            raise ValueError("column %s is full" % move)
+        if position.move_count() and position.winner_at(position.moves[-1]) != EMPTY:
+            raise ValueError("moves continue after the game was won")
+        position.make_move(col, piece)
+        piece = other_piece(piece)
+    return position, piece
+
+
+def format_score(score, piece, move_count, depth):
+    # score is from the AI's point of view, as the search returns it
+    if abs(score) < -PLAYER_WIN_SCORE:
+        return "cp %d" % (score if piece == AI_PIECE else -score)
+    winner = AI_PIECE if score > 0 else PLAYER_PIECE
+    wins = winner == piece
+    # The exact solver adds the Pons score p (stones left to the winner)
+    # to the win scores, placing the win on ply 42 - 2p or 43 - 2p; a
+    # plain search only knows the win is within depth plies
+    offset = score - AI_WIN_SCORE if winner == AI_PIECE else PLAYER_WIN_SCORE - score
+    if offset > 0:
+        win_ply = CELLS - 2 * offset + 1
+        if (win_ply - move_count) % 2 != (1 if wins else 0):
+            win_ply += 1
+        plies = win_ply - move_count
+    else:
+        plies = depth
+    return "mate %d" % ((plies + 1) // 2 if wins else -((plies + 1) // 2))
+
+
+def solver_variation(position, piece, max_length, prefix=()):
+    # Continues the line prefix, once it reaches a position the exact
+    # solver handles, up to max_length moves in all. The solver keeps no
+    # best moves, so each position along the line is solved in turn; its
+    # table makes the later ones cheap.
+    position = position.copy()
+    for col in prefix:
+        position.make_move(col, piece)
+        if position.winner_at(col) != EMPTY:
+            return []
+        piece = other_piece(piece)
+    if not should_solve(position):
+        return []
+    line = []
+    while len(prefix) + len(line) < max_length and not position.is_full():
+        col = solve_position(position, piece == AI_PIECE)[0]
+        position.make_move(col, piece)
+        line.append(col)
+        if position.winner_at(col) != EMPTY:
+            break
+        piece = other_piece(piece)
+    return line
+
+
+class UCIEngine:
+    # Keeps one Searcher and its transposition table for the life of the
+    # process, so later moves start from what earlier searches stored.
+    # Searches run on a thread so stop and quit are read while they run.
+
+    def __init__(self, output=None, table_bytes=TT_MEMORY_BYTES):
+        self.output = output or sys.stdout
+        self.output_lock = threading.Lock()
+        self.stop_flag = SimpleNamespace(value=False)
+        self.moves = ""
+        self.max_depth = None
+        self.thread = None
+        self._new_searcher(TranspositionTable(table_bytes))
+
+    def _new_searcher(self, table):
+        self.table = table
+        self.searcher = Searcher(table)
+        self.searcher.stop_flag = self.stop_flag
+        self.searcher.subscribe(self._report_iteration)
+
+    def send(self, line):
+        with self.output_lock:
+            self.output.write(line + "\n")
+            self.output.flush()
+
+    def handle(self, line):
+        # Runs one command line; returns False on quit
+        tokens = line.split()
+        if not tokens:
+            return True
+        command, args = tokens[0], tokens[1:]
+        if command == "quit":
+            self.stop()
+            return False
+        if command == "uci":
+            self.send("id name %s" % ENGINE_NAME)
+            self.send("id author %s" % ENGINE_AUTHOR)
+            self.send("option name Hash type spin default %d min 1 max 4096" % (TT_MEMORY_BYTES // (1024 * 1024)))
+            self.send("uciok")
+        elif command == "isready":
+            self.send("readyok")  # At once, even mid-search, so a later stop is still read
+        elif command == "stop":
+            self.stop()
+        elif command in ("ucinewgame", "setoption", "position", "go"):
+            self.stop()
+            try:
+                getattr(self, "_" + command)(args)
+            except ValueError as error:
+                self.send("info string %s" % error)
+        else:
+            self.send("info string unknown command %r" % command)
+        return True
+
+    def _ucinewgame(self, args):
+        self.table.clear()
+        self._new_searcher(self.table)
+        self.moves = ""
+
+    def _setoption(self, args):
+        # setoption name Hash value MB
+        if len(args) != 4 or args[0] != "name" or args[2] != "value" or args[1].lower() != "hash":
+            raise ValueError("unknown option %s" % " ".join(args))
+        megabytes = int(args[3])
+        if not 1 <= megabytes <= 4096:
+            raise ValueError("Hash must be between 1 and 4096 MB")
+        self._new_searcher(TranspositionTable(megabytes * 1024 * 1024))
+
+    def _position(self, args):
+        args = [arg for arg in args if arg not in ("startpos", "moves")]
+        moves = "".join(args)
+        parse_moves(moves)
+        self.moves = moves
+
+    def _go(self, args):
+        time_budget = MOVE_TIME_BUDGET
+        max_depth = None
+        if args:
+            if args[0] == "depth" and len(args) == 2:
+                max_depth = int(args[1])
+                if max_depth < 1:
+                    raise ValueError("depth must be at least 1")
+                time_budget = math.inf
+            elif args[0] == "movetime" and len(args) == 2:
+                time_budget = int(args[1]) / 1000
+            elif args == ["infinite"]:
+                time_budget = math.inf
+            else:
+                raise ValueError("expected go depth N, go movetime MS or go infinite")
+        position, piece = parse_moves(self.moves)
+        self.stop_flag.value = False
+        self.max_depth = max_depth
+        self.thread = threading.Thread(target=self._search, args=(position, piece, time_budget, max_depth))
+        self.thread.start()
+
+    def _search(self, position, piece, time_budget, max_depth):
+        self.position = position
+        self.piece = piece
+        self.searcher.nodes = 0
+        if position.is_full() or (position.moves and position.winner_at(position.moves[-1]) != EMPTY):
+            self.send("bestmove (none)")
+            return
+        col, score = self.searcher.iterative_deepening(position, time_budget, piece == AI_PIECE, max_depth)
+        if col is None:  # No depth completed; any legal move beats leaving the controller waiting
+            col = get_valid_locations(position)[0]
+        self.send("bestmove %d" % (col + 1))
+
+    def _report_iteration(self, record):
+        # Searcher hook, on the search thread. Late positions are answered
+        # by the exact solver in one step, reported at the depth asked for.
+        elapsed = max(record["elapsed"], 1e-6)
+        nodes = record["nodes"] + record["solver_nodes"]
+        depth = record["depth"]
+        if self.max_depth is not None:
+            depth = min(depth, self.max_depth)
+        line = [] if record["solver_nodes"] else principal_variation(self.position, self.piece, self.table, depth)
+        line += solver_variation(self.position, self.piece, depth, line)
+        if not line or line[0] != record["move"]:
+            line = [record["move"]]
+        self.send("info depth %d score %s nodes %d nps %d time %d pv %s" % (
+            depth,
+            format_score(record["score"], self.piece, self.position.move_count(), depth),
+            nodes,
+            nodes / elapsed,
+            1000 * record["elapsed"],
+            " ".join(str(col + 1) for col in line),
+        ))
+
+    def wait(self):
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def stop(self):
+        if self.thread is not None:
+            self.stop_flag.value = True
+            self.wait()
+
+
+def main():
+    engine = UCIEngine()
+    for line in sys.stdin:
+        if not engine.handle(line):
+            break
+    engine.wait()
+
+
+if __name__ == "__main__":
+    main()
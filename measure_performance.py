@@ -1,10 +1,17 @@
-import numpy as np
 import pygame
 import sys
 import math
 import random
 import time
 
+from engine import search as engine_search
+from engine.bitboard import Position
+from engine.board import create_board, drop_piece, get_next_open_row, is_valid_location, print_board, winning_move
+from engine.constants import AI_PIECE, COLUMN_COUNT, PLAYER_PIECE, ROW_COUNT
+from engine.incremental import IncrementalEvaluation
+from engine.memory import format_allocations, measure_allocations
+from engine.stats import SearchStats
+
 burgundy = (128, 0, 32)
 blue = (173, 216, 230)
 silver = (169, 169, 169)
@@ -15,18 +22,9 @@ BLACK = (0, 0, 0)
 RED = (255, 0, 0)
 YELLOW = (255, 255, 0)
 
-ROW_COUNT = 6
-COLUMN_COUNT = 7
-
 PLAYER = 0
 AI = 1
 
-EMPTY = 0
-PLAYER_PIECE = 1
-AI_PIECE = 2
-
-WINDOW_LENGTH = 4
-
 depth = 3
 
 # Game states
@@ -60,198 +58,6 @@ current_difficulty_level = DEFAULT_DIFFICULTY_LEVEL
 current_algorithm_option = DEFAULT_ALGORITHM_OPTION
 
 
-def create_board():
-    board = np.zeros((ROW_COUNT, COLUMN_COUNT))
-    return board
-
-
-def drop_piece(board, row, col, piece):
-    board[row][col] = piece
-
-
-def is_valid_location(board, col):
-    return board[ROW_COUNT - 1][col] == 0
-
-
-def get_next_open_row(board, col):
-    for r in range(ROW_COUNT):
-        if board[r][col] == 0:
-            return r
-
-
-def print_board(board):
-    print(np.flip(board, 0))
-
-
-def winning_move(board, piece):
-    # Check horizontal locations for win
-    for c in range(COLUMN_COUNT - 3):
-        for r in range(ROW_COUNT):
-            if (
-                    board[r][c] == piece
-                    and board[r][c + 1] == piece
-                    and board[r][c + 2] == piece
-                    and board[r][c + 3] == piece
-            ):
-                return True
-
-    # Check vertical locations for win
-    for c in range(COLUMN_COUNT):
-        for r in range(ROW_COUNT - 3):
-            if (
-                    board[r][c] == piece
-                    and board[r + 1][c] == piece
-                    and board[r + 2][c] == piece
-                    and board[r + 3][c] == piece
-            ):
-                return True
-
-    # Check positively sloped diaganols
-    for c in range(COLUMN_COUNT - 3):
-        for r in range(ROW_COUNT - 3):
-            if (
-                    board[r][c] == piece
-                    and board[r + 1][c + 1] == piece
-                    and board[r + 2][c + 2] == piece
-                    and board[r + 3][c + 3] == piece
-            ):
-                return True
-
-    # Check negatively sloped diaganols
-    for c in range(COLUMN_COUNT - 3):
-        for r in range(3, ROW_COUNT):
-            if (
-                    board[r][c] == piece
-                    and board[r - 1][c + 1] == piece
-                    and board[r - 2][c + 2] == piece
-                    and board[r - 3][c + 3] == piece
-            ):
-                return True
-
-    return False
-
-
-def evaluate_window(window, piece):
-    score = 0
-    opponent_piece = PLAYER_PIECE if piece == AI_PIECE else AI_PIECE
-
-    if window.count(piece) == 4:
-        score += 100
-    elif window.count(piece) == 3 and window.count(EMPTY) == 1:
-        score += 5
-    elif window.count(piece) == 2 and window.count(EMPTY) == 2:
-        score += 2
-
-    if window.count(opponent_piece) == 3 and window.count(EMPTY) == 1:
-        score -= 4
-
-    return score
-
-
-def score_position(board, piece):
-    score = 0
-
-    # Score center column
-    center_array = [int(i) for i in list(board[:, COLUMN_COUNT // 2])]
-    center_count = center_array.count(piece)
-    score += center_count * 3
-
-    # Score horizontal
-    for r in range(ROW_COUNT):
-        row_array = [int(i) for i in list(board[r, :])]
-        for c in range(COLUMN_COUNT - 3):
-            window = row_array[c: c + WINDOW_LENGTH]
-            score += evaluate_window(window, piece)
-
-    # Score vertical
-    for c in range(COLUMN_COUNT):
-        col_array = [int(i) for i in list(board[:, c])]
-        for r in range(ROW_COUNT - 3):
-            window = col_array[r: r + WINDOW_LENGTH]
-            score += evaluate_window(window, piece)
-
-    # Score positive sloped diagonal
-    for r in range(ROW_COUNT - 3):
-        for c in range(COLUMN_COUNT - 3):
-            window = [board[r + i][c + i] for i in range(WINDOW_LENGTH)]
-            score += evaluate_window(window, piece)
-
-    # Score negative sloped diagonal
-    for r in range(ROW_COUNT - 3):
-        for c in range(COLUMN_COUNT - 3):
-            window = [board[r + 3 - i][c + i] for i in range(WINDOW_LENGTH)]
-            score += evaluate_window(window, piece)
-
-    return score
-
-
-def is_terminal_node(board):
-    return winning_move(board, PLAYER_PIECE) or winning_move(board, AI_PIECE) or len(
-        get_valid_locations(board)
-    ) == 0
-
-
-def get_valid_locations(board):
-    valid_locations = []
-    for col in range(COLUMN_COUNT):
-        if is_valid_location(board, col):
-            valid_locations.append(col)
-    return valid_locations
-
-
-def minimax(board, depth, alpha, beta, maximizingPlayer):
-    valid_locations = get_valid_locations(board)
-    is_terminal = is_terminal_node(board)
-
-    if depth == 0 or is_terminal:
-        if is_terminal:
-            if winning_move(board, AI_PIECE):
-                return (None, 100000000000000)
-            elif winning_move(board, PLAYER_PIECE):
-                return (None, -10000000000000)
-            else:  # Game is over, no more valid moves
-                return (None, 0)
-        else:  # Depth is zero
-            return (None, score_position(board, AI_PIECE))
-
-    if maximizingPlayer:
-        value = -math.inf
-        column = random.choice(valid_locations)
-        for col in valid_locations:
-            row = get_next_open_row(board, col)
-            b_copy = board.copy()
-            drop_piece(b_copy, row, col, AI_PIECE)
-            new_score = minimax(b_copy, depth - 1, alpha, beta, False)[1]
-            if new_score > value:
-                value = new_score
-                column = col
-
-            if alpha is not None and beta is not None:
-                alpha = max(alpha, value)
-                if alpha >= beta:
-                    break
-
-        return column, value
-
-    else:  # Minimizing player
-        value = math.inf
-        column = random.choice(valid_locations)
-        for col in valid_locations:
-            row = get_next_open_row(board, col)
-            b_copy = board.copy()
-            drop_piece(b_copy, row, col, PLAYER_PIECE)
-            new_score = minimax(b_copy, depth - 1, alpha, beta, True)[1]
-            if new_score < value:
-                value = new_score
-                column = col
-
-            if beta != None and alpha != None:
-                beta = min(beta, value)
-                if alpha >= beta:
-                    break
-        return column, value
-
-
 def draw_board(board):
     for c in range(COLUMN_COUNT):
         for r in range(ROW_COUNT):
@@ -435,98 +241,121 @@ def handle_difficulty_selection_events():
             elif event.key == pygame.K_2:
                 print('ALPHA_BETA')
                 return 2
-pygame.init()
-game_over = False
+
+
 SQUARESIZE = 100
 
 width = COLUMN_COUNT * SQUARESIZE
 height = (ROW_COUNT + 1) * SQUARESIZE
 size = (width, height)
 
-myfont = pygame.font.SysFont("arielblack", 75)
-
 RADIUS = SQUARESIZE // 2 - 5
 
-screen = pygame.display.set_mode(size)
-draw_menu()
-menu_selected_level = None
-difficulty_selection_selected_algorithm = None
+# Set up by main(), so importing this module opens no window and starts
+# no game
+screen = None
+myfont = None
+board = None
 game_state = MENU
-turn = random.randint(PLAYER, AI)
-
-while True:
-    if game_state == MENU:
-
-        menu_selected_level = handle_menu_events()
-        if menu_selected_level is not None:
-            game_state = DIFFICULTY_SELECTION
-            current_difficulty_level = menu_selected_level
-            draw_difficulty_selection()
-
-    elif game_state == DIFFICULTY_SELECTION:
-        difficulty_selection_selected_algorithm = handle_difficulty_selection_events()
-        if difficulty_selection_selected_algorithm is not None:
-            game_state = GAME
-            current_algorithm_option = difficulty_selection_selected_algorithm
-            print(current_algorithm_option)
-            initialize_game()
-    elif game_state == GAME:
-        print("turn=", turn)
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-
-            elif event.type == pygame.MOUSEBUTTONDOWN:
-                pass
-
-            # Player's turn
-        if turn == PLAYER and game_over == False:
-            col = random.randint(0, COLUMN_COUNT - 1)
-            if is_valid_location(board, col):
-                pygame.time.wait(500)
-                row = get_next_open_row(board, col)
-                drop_piece(board, row, col, PLAYER_PIECE)
 
-                if winning_move(board, PLAYER_PIECE):
-                    label = myfont.render("Player 1 wins!!", 1, RED)
-                    screen.blit(label, (40, 10))
-                    game_over = True
-                turn += 1
-                turn = turn % 2
 
-                print_board(board)
-                draw_board(board)
-
-
-        elif turn == AI and game_over == False:
-        ##MEASURING TIME
-            start_time = time.time()
-            if current_algorithm_option == 1:
-                col, minimax_score = minimax(board, depth, None, None, True)
-
-            elif current_algorithm_option == 2:
-                col, minimax_score = minimax(board, 5, -math.inf, math.inf, True)
-
-            if is_valid_location(board, col):
-                pygame.time.wait(500)
-                row = get_next_open_row(board, col)
-                drop_piece(board, row, col, AI_PIECE)
-
-                if winning_move(board, AI_PIECE):
-                    label = myfont.render("Ai agent wins!!", 1, violet)
-                    screen.blit(label, (40, 10))
-                    game_over = True
-                turn += 1
-                turn = turn % 2
+def main():
+    global screen, myfont, game_state, current_difficulty_level, current_algorithm_option
+    pygame.init()
+    myfont = pygame.font.SysFont("arielblack", 75)
+    screen = pygame.display.set_mode(size)
+    draw_menu()
+    game_over = False
+    menu_selected_level = None
+    difficulty_selection_selected_algorithm = None
+    game_state = MENU
+    turn = random.randint(PLAYER, AI)
+
+    while True:
+        if game_state == MENU:
+
+            menu_selected_level = handle_menu_events()
+            if menu_selected_level is not None:
+                game_state = DIFFICULTY_SELECTION
+                current_difficulty_level = menu_selected_level
+                draw_difficulty_selection()
+
+        elif game_state == DIFFICULTY_SELECTION:
+            difficulty_selection_selected_algorithm = handle_difficulty_selection_events()
+            if difficulty_selection_selected_algorithm is not None:
+                game_state = GAME
+                current_algorithm_option = difficulty_selection_selected_algorithm
+                print(current_algorithm_option)
+                initialize_game()
+        elif game_state == GAME:
+            print("turn=", turn)
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    pygame.quit()
+                    sys.exit()
+
+                elif event.type == pygame.MOUSEBUTTONDOWN:
+                    pass
+
+                # Player's turn
+            if turn == PLAYER and game_over == False:
+                col = random.randint(0, COLUMN_COUNT - 1)
+                if is_valid_location(board, col):
+                    pygame.time.wait(500)
+                    row = get_next_open_row(board, col)
+                    drop_piece(board, row, col, PLAYER_PIECE)
+
+                    if winning_move(board, PLAYER_PIECE):
+                        label = myfont.render("Player 1 wins!!", 1, RED)
+                        screen.blit(label, (40, 10))
+                        game_over = True
+                    turn += 1
+                    turn = turn % 2
+
+                    print_board(board)
+                    draw_board(board)
+
+
+            elif turn == AI and game_over == False:
+            ##MEASURING TIME
+                start_time = time.time()
+                position = Position.from_array(board, IncrementalEvaluation())
+                stats = SearchStats()
+                if current_algorithm_option == 1:
+                    (col, minimax_score), allocations = measure_allocations(
+                        engine_search.minimax, position, depth, None, None, True, stats=stats
+                    )
+
+                elif current_algorithm_option == 2:
+                    (col, minimax_score), allocations = measure_allocations(
+                        engine_search.minimax, position, 5, -math.inf, math.inf, True, stats=stats
+                    )
+                print("search allocations:", format_allocations(allocations))
+                print("search stats:", stats.format())
+
+                if is_valid_location(board, col):
+                    pygame.time.wait(500)
+                    row = get_next_open_row(board, col)
+                    drop_piece(board, row, col, AI_PIECE)
+
+                    if winning_move(board, AI_PIECE):
+                        label = myfont.render("Ai agent wins!!", 1, violet)
+                        screen.blit(label, (40, 10))
+                        game_over = True
+                    turn += 1
+                    turn = turn % 2
+
+                    print_board(board)
+                    draw_board(board)
+
+                ##MEASURING TIME
+            end_time = time.time()
+            if game_over:
+                print("over")
+                print("total time taken:  ", end_time-start_time)
+                pygame.time.wait(3000)
+                sys.exit()
 
-                print_board(board)
-                draw_board(board)
 
-            ##MEASURING TIME
-        end_time = time.time()
-        if game_over:
-            print("over")
-            print("total time taken:  ", end_time-start_time)
-            pygame.time.wait(3000)
-            sys.exit()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import random
+
+import numpy as np
+import pytest
+
+from engine.board import (
+    create_board,
+    get_column_heights,
+    get_valid_locations,
+    last_move_winner,
+    make_move,
+    undo_move,
+    winning_move,
+    winning_move_at,
+)
+from engine.constants import AI_PIECE, EMPTY, PLAYER_PIECE, other_piece
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_last_move_checks_match_full_scan(seed):
+    # Until someone wins, the move just played wins exactly when the full
+    # board scan finds four in a row for its piece
+    rng = random.Random(seed)
+    board = create_board()
+    heights = get_column_heights(board)
+    piece = rng.choice((PLAYER_PIECE, AI_PIECE))
+    while get_valid_locations(board):
+        col = rng.choice(get_valid_locations(board))
+        row = make_move(board, heights, col, piece)
+        won = winning_move(board, piece)
+        assert winning_move_at(board, row, col, piece) == won
+        expected = piece if won else EMPTY
+        assert last_move_winner(board, col) == expected
+        assert last_move_winner(board, col, heights) == expected
+        if won:
+            break
+        piece = other_piece(piece)
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_make_undo_round_trip(seed):
+    rng = random.Random(seed)
+    board = create_board()
+    heights = get_column_heights(board)
+    played = []
+    snapshots = [board.copy()]
+    piece = PLAYER_PIECE
+    for _ in range(150):
+        valid = get_valid_locations(board)
+        if valid and (not played or rng.random() < 0.65):
+            col = rng.choice(valid)
+            make_move(board, heights, col, piece)
+            played.append(col)
+            snapshots.append(board.copy())
+        else:
+            undo_move(board, heights, played.pop())
+            snapshots.pop()
+            assert np.array_equal(board, snapshots[-1])
+        piece = PLAYER_PIECE if len(played) % 2 == 0 else AI_PIECE
+        assert heights == get_column_heights(board)
+
+    while played:
+        undo_move(board, heights, played.pop())
+    assert np.array_equal(board, create_board())
+    assert heights == [0] * len(heights)
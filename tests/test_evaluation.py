@@ -0,0 +1,75 @@
+import random
+
+import numpy as np
+import pytest
+
+from engine.board import create_board, drop_piece, get_next_open_row, get_valid_locations, winning_move
+from engine.constants import AI_PIECE, PLAYER_PIECE, WINDOW_LENGTH, other_piece
+from engine.evaluation import (
+    WINDOW_CODE_COUNT,
+    WINDOW_CODE_SCORES,
+    WINDOW_INDEX,
+    _window_codes,
+    evaluate_positions,
+    evaluate_window,
+    score_position,
+    score_position_reference,
+    score_positions,
+)
+
+
+def random_boards(seed, count):
+    # Boards from random legal games cut at every length, play continuing
+    # past a win so full and many-threat boards come up too
+    rng = random.Random(seed)
+    boards = []
+    while len(boards) < count:
+        board = create_board()
+        piece = rng.choice((PLAYER_PIECE, AI_PIECE))
+        boards.append(board.copy())
+        for _ in range(rng.randrange(43)):
+            col = rng.choice(get_valid_locations(board))
+            drop_piece(board, get_next_open_row(board, col), col, piece)
+            piece = other_piece(piece)
+            boards.append(board.copy())
+    return boards[:count]
+
+
+BOARDS = random_boards(4, 600)
+
+
+@pytest.mark.parametrize("piece", [PLAYER_PIECE, AI_PIECE])
+def test_score_position_matches_reference(piece):
+    for board in BOARDS:
+        assert score_position(board, piece) == score_position_reference(board, piece)
+
+
+@pytest.mark.parametrize("piece", [PLAYER_PIECE, AI_PIECE])
+@pytest.mark.parametrize("chunk_size", [1, 7, 1 << 16])
+def test_batch_matches_single_board_calls(piece, chunk_size):
+    scores, wins = evaluate_positions(np.stack(BOARDS), piece, chunk_size)
+    assert scores.tolist() == [score_position_reference(board, piece) for board in BOARDS]
+    assert wins.tolist() == [bool(winning_move(board, piece)) for board in BOARDS]
+    assert score_positions(np.stack(BOARDS), piece, chunk_size).tolist() == scores.tolist()
+
+
+def test_batch_rejects_wrong_shape():
+    with pytest.raises(ValueError):
+        score_positions(np.zeros((3, 7, 6)), PLAYER_PIECE)
+
+
+@pytest.mark.parametrize("piece", [PLAYER_PIECE, AI_PIECE])
+def test_window_code_scores_match_evaluate_window(piece):
+    # Every base-3 window code, cell i weighing 3**i
+    for code in range(WINDOW_CODE_COUNT):
+        window = [(code // 3 ** i) % 3 for i in range(WINDOW_LENGTH)]
+        assert WINDOW_CODE_SCORES[piece][code] == evaluate_window(window, piece), window
+
+
+def test_window_codes_encode_the_window_cells():
+    boards = np.stack(BOARDS)
+    weights = 3 ** np.arange(WINDOW_LENGTH)
+    for start, cells, codes in _window_codes(boards, 100):
+        flat = boards[start:start + cells.shape[1]].reshape(cells.shape[1], -1)
+        expected = (flat[:, WINDOW_INDEX] * weights).sum(axis=2).T
+        assert np.array_equal(codes, expected)
@@ -0,0 +1,53 @@
+import random
+
+import pytest
+
+from engine.bitboard import Position
+from engine.constants import AI_PIECE, PLAYER_PIECE
+from engine.evaluation import score_position
+from engine.incremental import IncrementalEvaluation
+
+
+def assert_matches_full_evaluation(position):
+    board = position.to_array()
+    for piece in (PLAYER_PIECE, AI_PIECE):
+        assert position.evaluation.scores[piece] == score_position(board, piece)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_random_make_undo_matches_score_position(seed):
+    # consistency_check cross-checks every make_move and undo_move against
+    # score_position and raises on a mismatch; the scores are also compared
+    # here after each step
+    rng = random.Random(seed)
+    position = Position(IncrementalEvaluation(consistency_check=True))
+    for _ in range(200):
+        moves = position.valid_moves()
+        if moves and (not position.moves or rng.random() < 0.7):
+            piece = PLAYER_PIECE if position.move_count() % 2 == 0 else AI_PIECE
+            position.make_move(rng.choice(moves), piece)
+        else:
+            position.undo_move()
+        assert_matches_full_evaluation(position)
+
+    while position.moves:
+        position.undo_move()
+    assert position.evaluation.scores == [0, 0, 0]
+
+
+def test_copy_keeps_consistency_check():
+    position = Position(IncrementalEvaluation(consistency_check=True))
+    position.make_move(3, PLAYER_PIECE)
+    copy = position.copy()
+    assert copy.evaluation.consistency_check
+    copy.make_move(3, AI_PIECE)
+    assert_matches_full_evaluation(copy)
+    assert_matches_full_evaluation(position)
+
+
+def test_consistency_check_catches_a_wrong_score():
+    position = Position(IncrementalEvaluation(consistency_check=True))
+    position.make_move(3, PLAYER_PIECE)
+    position.evaluation.scores[AI_PIECE] += 1
+    with pytest.raises(AssertionError):
+        position.make_move(2, AI_PIECE)
@@ -0,0 +1,53 @@
+import random
+
+import pytest
+
+from engine.records import GameRecordFile, GameRecordWriter, read_games
+
+GAMES = [
+    ([random.Random(n).randrange(7) for _ in range(7 + n % 36)], 1 + n % 2, n % 3)
+    for n in range(50)
+]
+
+
+def write(path, games):
+    with GameRecordWriter(str(path)) as writer:
+        for game in games:
+            writer.write_game(*game)
+
+
+def read_indexed(path):
+    with GameRecordFile(str(path)) as records:
+        return [tuple(records.game(n)) for n in range(len(records))]
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / "games.c4g"
+    write(path, GAMES[:30])
+    write(path, GAMES[30:])
+    assert [tuple(game) for game in read_games(str(path), chunk_size=7)] == GAMES
+    assert read_indexed(path) == GAMES
+
+
+@pytest.mark.parametrize("damage", ["missing entries", "torn entry", "junk", "deleted"])
+def test_stale_index_is_rebuilt_on_reopen(tmp_path, damage):
+    path = tmp_path / "games.c4g"
+    index = tmp_path / "games.c4g.idx"
+    write(path, GAMES[:30])
+    if damage == "deleted":
+        index.unlink()
+    elif damage == "junk":
+        index.write_bytes(b"junk")
+    else:
+        index.write_bytes(index.read_bytes()[:-40 if damage == "missing entries" else -3])
+    write(path, GAMES[30:])
+    assert read_indexed(path) == GAMES
+
+
+def test_game_cut_off_by_a_crash_is_dropped_on_reopen(tmp_path):
+    path = tmp_path / "games.c4g"
+    write(path, GAMES[:30])
+    path.write_bytes(path.read_bytes()[:-4])
+    write(path, GAMES[30:])
+    assert read_indexed(path) == GAMES[:29] + GAMES[30:]
+    assert [tuple(game) for game in read_games(str(path))] == GAMES[:29] + GAMES[30:]
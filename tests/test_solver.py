@@ -0,0 +1,83 @@
+import random
+
+import pytest
+
+from engine.bitboard import Position
+from engine.constants import AI_PIECE, COLUMN_COUNT, PLAYER_PIECE, ROW_COUNT, other_piece
+from engine.solver import Solver, SolverTable
+
+CELLS = ROW_COUNT * COLUMN_COUNT
+
+
+def random_position(rng, empty_cells):
+    # (position, piece to move) after random moves, or None if the game
+    # ended first
+    position = Position()
+    piece = PLAYER_PIECE
+    while CELLS - position.move_count() > empty_cells:
+        col = rng.choice(position.valid_moves())
+        position.make_move(col, piece)
+        if position.winner_at(col):
+            return None
+        piece = other_piece(piece)
+    return position, piece
+
+
+def random_positions(seed, count, empty_cells):
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        found = random_position(rng, rng.choice(empty_cells))
+        if found is not None:
+            positions.append(found)
+    return positions
+
+
+def brute_force(position, piece):
+    # Exact score for piece to move on the solver's scale, by full search
+    best = -CELLS
+    moves = position.move_count()
+    for col in position.valid_moves():
+        position.make_move(col, piece)
+        if position.winner_at(col):
+            score = (CELLS + 1 - moves) // 2
+        elif position.is_full():
+            score = 0
+        else:
+            score = -brute_force(position, other_piece(piece))
+        position.undo_move()
+        best = max(best, score)
+    return best
+
+
+def solve(solver, position, piece):
+    mask = position.pieces[PLAYER_PIECE] | position.pieces[AI_PIECE]
+    return solver.solve(position.pieces[piece], mask, position.move_count())
+
+
+def test_solver_matches_brute_force():
+    solver = Solver(SolverTable(1 << 12))  # Small, so positions share slots
+    for position, piece in random_positions(1, 40, (5, 6, 7, 8)):
+        assert solve(solver, position, piece) == brute_force(position, piece), repr(position)
+
+
+@pytest.mark.parametrize("table_bytes", [1 << 10, 1 << 16])
+def test_shared_solver_matches_fresh_solver(table_bytes):
+    # One solver kept across many positions, as get_solver() is, must give
+    # the values a fresh solver gives
+    shared = Solver(SolverTable(table_bytes))
+    for position, piece in random_positions(2, 60, range(8, COLUMN_COUNT * 2 + 1)):
+        assert solve(shared, position, piece) == solve(Solver(SolverTable(1 << 16)), position, piece), repr(position)
+
+
+def test_solver_table_keeps_keys_exact():
+    table = SolverTable(1 << 10)
+    key = 0x14C24B1D4080
+    table.put(key, -3)
+    assert table.get(key) == -3
+    assert table.get(key + 1) is None
+    assert table.get(key + table.size) is None  # Same slot, different key
+    table.put(key + 1, 5)
+    assert table.get(key + 1) == 5
+    table.clear()
+    assert table.get(key + 1) is None
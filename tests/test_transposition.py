@@ -0,0 +1,65 @@
+import pytest
+
+from engine.bitboard import Position, cell_bit
+from engine.constants import AI_PIECE, PLAYER_PIECE
+from engine.solver import Solver, solve_position
+from engine.transposition import EXACT, LOWER_BOUND, SharedTranspositionTable, TranspositionTable
+
+
+@pytest.fixture(params=["local", "shared"])
+def table(request):
+    if request.param == "local":
+        yield TranspositionTable(1 << 16)
+    else:
+        shared = SharedTranspositionTable(1 << 16)
+        yield shared
+        shared.close()
+
+
+def test_fresh_table_misses_key_zero(table):
+    # 0 is the empty board's key with the player to move, not an empty slot
+    assert Position().hash == 0
+    assert table.probe(0) is None
+    assert table.hits == 0
+
+
+def test_key_zero_round_trips(table):
+    table.store(0, 5, LOWER_BOUND, -7, 3)
+    assert table.probe(0) == (5, LOWER_BOUND, -7, 3)
+
+
+def test_keys_differing_in_the_low_bit_stay_apart(table):
+    key = 0x14C24B1D4081
+    table.store(key, 3, EXACT, 11, 2)
+    assert table.probe(key ^ 1) is None
+    table.store(key ^ 1, 3, EXACT, -11, 5)
+    assert table.probe(key) == (3, EXACT, 11, 2)
+    assert table.probe(key ^ 1) == (3, EXACT, -11, 5)
+
+
+def _position(moves):
+    position = Position()
+    piece = PLAYER_PIECE
+    for move in moves:
+        position.make_move(int(move) - 1, piece)
+        piece = AI_PIECE if piece == PLAYER_PIECE else PLAYER_PIECE
+    return position, piece
+
+
+def test_solver_keeps_positions_with_adjacent_keys_apart():
+    # The solver keys a position by current + mask. This one has the first
+    # column empty; its partner swaps the colours and adds the other side's
+    # stone at the bottom of that column, which gives the key plus one.
+    position, piece = _position("574553343466434432766535")
+    partner = Position.from_masks(position.pieces[AI_PIECE] | cell_bit(0, 0), position.pieces[PLAYER_PIECE])
+    partner_piece = AI_PIECE if partner.move_count() % 2 else PLAYER_PIECE
+
+    def key(p, to_move):
+        return p.pieces[to_move] + (p.pieces[PLAYER_PIECE] | p.pieces[AI_PIECE])
+
+    assert key(partner, partner_piece) == key(position, piece) + 1
+
+    solver = Solver()
+    solve_position(partner, partner_piece == AI_PIECE, solver)
+    expected = solve_position(position, piece == AI_PIECE, Solver())
+    assert solve_position(position, piece == AI_PIECE, solver)[1] == expected[1]